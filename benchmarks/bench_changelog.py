@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: compare changelog prepend strategies on a big changelog
+##
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from wallix_packager.io import readall, writeall
+from wallix_packager.packager import update_changelog
+
+ENTRY = ('packager (9.9.9) unstable; urgency=low\n\n'
+         '  * New release.\n\n'
+         ' -- WAB Dev Team <wab@wallix.com>  Mon, 01 Jan 2024 00:00:00 +0200\n\n')
+
+
+def old_update_changelog(changelog_path, changelog):
+    changelog += readall(changelog_path)
+    writeall(changelog_path, changelog)
+
+
+def make_changelog(path, size):
+    block = ENTRY * (1 << 14)
+    with open(path, 'w') as f:
+        written = 0
+        while written < size:
+            written += f.write(block)
+
+
+def measure(func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(path, ENTRY)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(size_mb=100):
+    with tempfile.TemporaryDirectory() as d:
+        path = f'{d}/changelog'
+        make_changelog(path, size_mb << 20)
+        print(f'changelog: {os.path.getsize(path) >> 20} MiB')
+        for name, func in (('read + write', old_update_changelog),
+                           ('streaming prepend', update_changelog)):
+            elapsed, peak = measure(func, path)
+            print(f'{name:<18} {elapsed:.3f}s  peak python memory: {peak / (1 << 20):.1f} MiB')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
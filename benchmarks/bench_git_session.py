@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: count git processes of read-only queries with and without GitSession
+##
+
+import io
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from wallix_packager.shell import shell_cmd, git_current_branch
+from wallix_packager.git_session import GitSession
+
+
+class ForkCounter:
+    def __init__(self):
+        self.count = 0
+        self._init = subprocess.Popen.__init__
+
+    def __enter__(self):
+        counter = self
+        init = self._init
+
+        def counting_init(self, *args, **kwargs):
+            counter.count += 1
+            init(self, *args, **kwargs)
+
+        subprocess.Popen.__init__ = counting_init
+        return self
+
+    def __exit__(self, *args):
+        subprocess.Popen.__init__ = self._init
+
+
+def make_repo(path, nb_tags):
+    env = dict(os.environ, GIT_AUTHOR_NAME='bench', GIT_AUTHOR_EMAIL='bench@example.com',
+               GIT_COMMITTER_NAME='bench', GIT_COMMITTER_EMAIL='bench@example.com')
+    run = lambda *cmd: subprocess.run(cmd, cwd=path, env=env, check=True,
+                                      stdout=subprocess.DEVNULL)
+    run('git', 'init', '-q', '-b', 'main')
+    run('git', 'commit', '-q', '--allow-empty', '-m', 'init')
+    for i in range(nb_tags):
+        run('git', 'tag', f'1.0.{i}')
+
+
+def without_session(path, queries):
+    os.chdir(path)
+    git_current_branch()
+    tags = shell_cmd(['git', 'tag', '--list']).split('\n')
+    for tag in queries:
+        assert tag in tags
+        shell_cmd(['git', 'rev-parse', '-q', '--verify', f'refs/tags/{tag}^{{commit}}'])
+        shell_cmd(['git', 'cat-file', '-p', f'{tag}:'])
+
+
+def with_session(path, queries):
+    with GitSession(path) as session:
+        git_current_branch(session)
+        for tag in queries:
+            assert session.tag_exists(tag)
+            session.resolve(f'refs/tags/{tag}^{{commit}}')
+            session.read_object(f'{tag}:')
+
+
+def main(nb_tags=20, nb_queries=50):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as d:
+        make_repo(d, nb_tags)
+        queries = [f'1.0.{i % nb_tags}' for i in range(nb_queries)]
+        for name, func in (('one process per query', without_session),
+                           ('GitSession', with_session)):
+            with ForkCounter() as counter, redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                func(d, queries)
+                elapsed = time.perf_counter() - start
+            os.chdir(cwd)
+            print(f'{name:<22} {counter.count:4} processes  {elapsed:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
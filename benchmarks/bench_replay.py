@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: separate packager overhead from external command time
+#                     by recording a release flow then replaying it
+##
+
+import io
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from wallix_packager.shell import git_tag_exists
+from wallix_packager.tag import current_tag, issues_from
+from wallix_packager.tag_index import TagIndex
+from wallix_packager.runner import set_runner, RecordingRunner, ReplayRunner
+
+
+def make_repo(path, nb_tags):
+    env = dict(os.environ, GIT_AUTHOR_NAME='bench', GIT_AUTHOR_EMAIL='bench@example.com',
+               GIT_COMMITTER_NAME='bench', GIT_COMMITTER_EMAIL='bench@example.com')
+    origin = os.path.join(path, 'origin.git')
+    repo = os.path.join(path, 'repo')
+    run = lambda *cmd, cwd=path: subprocess.run(cmd, cwd=cwd, env=env, check=True,
+                                                stdout=subprocess.DEVNULL,
+                                                stderr=subprocess.DEVNULL)
+    run('git', 'init', '-q', '--bare', '-b', 'main', origin)
+    run('git', 'clone', '-q', origin, repo)
+    for i in range(nb_tags):
+        run('git', 'commit', '-q', '--allow-empty', '-m', f'fix WAB-{i}', cwd=repo)
+        run('git', 'tag', f'1.0.{i}', cwd=repo)
+    run('git', 'push', '-q', '--tags', 'origin', 'main', cwd=repo)
+    return repo
+
+
+def release_flow(nb_tags):
+    last_tag = current_tag('bench', 'main', True)
+    issues_from('1.0.0')
+    git_tag_exists(f'1.0.{nb_tags}')
+    index = TagIndex()
+    for i in range(nb_tags):
+        git_tag_exists(f'1.0.{i}', index)
+    return last_tag
+
+
+def measure(runner, nb_tags):
+    set_runner(runner)
+    try:
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            release_flow(nb_tags)
+            return time.perf_counter() - start
+    finally:
+        set_runner(None)
+
+
+def main(nb_tags=30):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as d:
+        os.chdir(make_repo(d, nb_tags))
+        cassette = os.path.join(d, 'cassette.json')
+        try:
+            recorder = RecordingRunner(cassette)
+            real = measure(recorder, nb_tags)
+            recorder.save()
+        finally:
+            os.chdir(cwd)
+
+        command_time = sum(i['duration'] for i in recorder.interactions)
+        overhead = measure(ReplayRunner(cassette), nb_tags)
+        simulated = measure(ReplayRunner(cassette, 1), nb_tags)
+
+    print(f'commands:              {len(recorder.interactions):8}')
+    print(f'real run:              {real:8.4f}s')
+    print(f'external commands:     {command_time:8.4f}s')
+    print(f'packager (replay x0):  {overhead:8.4f}s')
+    print(f'simulated (replay x1): {simulated:8.4f}s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: bytes and time of set_tag() on a fresh repository
+#                     with full, shallow and partial fetches
+##
+
+import io
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from wallix_packager.synchronizer import set_tag, FetchOptions, FULL_FETCH
+
+
+def make_bare_repo(path, nb_commits, blob_size):
+    env = dict(os.environ, GIT_AUTHOR_NAME='bench', GIT_AUTHOR_EMAIL='bench@example.com',
+               GIT_COMMITTER_NAME='bench', GIT_COMMITTER_EMAIL='bench@example.com')
+    work = os.path.join(path, 'work')
+    bare = os.path.join(path, 'origin.git')
+    run = lambda *cmd, cwd=path: subprocess.run(cmd, cwd=cwd, env=env, check=True,
+                                                stdout=subprocess.DEVNULL,
+                                                stderr=subprocess.DEVNULL)
+    run('git', 'init', '-q', '-b', 'main', work)
+    for i in range(nb_commits):
+        # incompressible content
+        with open(os.path.join(work, 'data.bin'), 'wb') as f:
+            f.write(os.urandom(blob_size))
+        run('git', 'add', 'data.bin', cwd=work)
+        run('git', 'commit', '-q', '-m', f'commit {i}', cwd=work)
+    run('git', 'tag', '1.0.0', cwd=work)
+    run('git', 'clone', '-q', '--bare', work, bare)
+    run('git', 'config', 'uploadpack.allowFilter', 'true', cwd=bare)
+    return bare
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            total += os.lstat(os.path.join(root, filename)).st_size
+    return total
+
+
+def sync(path, origin, options):
+    subprocess.run(['git', 'init', '-q', path], check=True)
+    subprocess.run(['git', 'remote', 'add', 'origin', origin], cwd=path, check=True)
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        # file:// uses the same transport as a remote server
+        set_tag(path, '1.0.0', options=options)
+        elapsed = time.perf_counter() - start
+    return dir_size(os.path.join(path, '.git')), elapsed
+
+
+def main(nb_commits=50, blob_size=256 * 1024):
+    modes = (
+        ('full', FULL_FETCH),
+        ('--depth 1', FetchOptions(depth=1)),
+        ('--filter blob:none', FetchOptions(filter='blob:none')),
+        ('--depth 1 --filter', FetchOptions(depth=1, filter='blob:none')),
+    )
+    with tempfile.TemporaryDirectory() as d:
+        origin = 'file://' + make_bare_repo(d, nb_commits, blob_size)
+        results = [(name, *sync(os.path.join(d, f'mode{i}'), origin, options))
+                   for i, (name, options) in enumerate(modes)]
+
+    full_size, full_time = results[0][1:]
+    for name, size, elapsed in results:
+        print(f'{name:<20} {size / 1024:10.0f} KiB  {elapsed:7.3f}s'
+              f'  saved: {(full_size - size) / 1024:10.0f} KiB  {full_time - elapsed:7.3f}s')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: compare replace_dict_all with compiled templates
+##
+
+import os
+import re
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from wallix_packager.template import var_ident, TemplateCache
+
+
+def old_replace_dict_all(text, variables):
+    rgx_replace_var = re.compile(f'%{var_ident}%')
+    text_parts = []
+    pos = 0
+    for m in rgx_replace_var.finditer(text):
+        text_parts.append(text[pos:m.start()])
+        var = m.group()
+        text_parts.append(variables.get(var[1:-1], ''))
+        pos = m.end()
+    text_parts.append(text[pos:])
+    return ''.join(text_parts)
+
+
+def make_template(nb_lines):
+    return ''.join(f'line {i} %PROJECT_NAME% (%PROJECT_VERSION%) some text\n'
+                   if i % 4 == 0 else f'line {i} without any variable, only text\n'
+                   for i in range(nb_lines))
+
+
+def main(nb_lines=50000, number=20):
+    variables = {'PROJECT_NAME': 'packager', 'PROJECT_VERSION': '1.2.3'}
+    with tempfile.TemporaryDirectory() as d:
+        path = f'{d}/template'
+        with open(path, 'w') as f:
+            f.write(make_template(nb_lines))
+
+        def old():
+            with open(path) as f:
+                return old_replace_dict_all(f.read(), variables)
+
+        cache = TemplateCache(f'{d}/cache.json')
+
+        def new():
+            return cache.get(path).render(variables)
+
+        assert old() == new()
+        cache.save()
+
+        t_old = timeit.timeit(old, number=number)
+        t_new = timeit.timeit(new, number=number)
+        t_cold = timeit.timeit(lambda: TemplateCache(f'{d}/cache.json').get(path).render(variables),
+                               number=number)
+
+    print(f'template: {nb_lines} lines, {number} renders')
+    print(f'replace_dict_all:          {t_old:.4f}s')
+    print(f'TemplateCache (memory):    {t_new:.4f}s  x{t_old / t_new:.1f}')
+    print(f'TemplateCache (from disk): {t_cold:.4f}s  x{t_old / t_cold:.1f}')
+
+
+if __name__ == '__main__':
+    main()
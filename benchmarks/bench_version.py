@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: compare tag sorting with less_version and Version
+##
+
+import os
+import re
+import sys
+import random
+import functools
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from wallix_packager.version import (re_match_version_to_tuple, parse_version,
+                                     sort_versions, latest_n)
+
+
+def old_less_version(lhs_version, rhs_version):
+    patt = re.compile(
+        r'[^\d]*(\d+)(?:\.(\d+))?(?:[-.](\d+))?(?:[-.](\d+))?(?:[-.](\d+))?(.*)')
+    m1 = patt.match(lhs_version)
+    m2 = patt.match(rhs_version)
+    return re_match_version_to_tuple(m1) < re_match_version_to_tuple(m2)
+
+
+def old_cmp(a, b):
+    return -1 if old_less_version(a, b) else 1 if old_less_version(b, a) else 0
+
+
+def make_tags(n):
+    rnd = random.Random(42)
+    return [f'{rnd.randrange(12)}.{rnd.randrange(20)}.{rnd.randrange(100)}'
+            + rnd.choice(('', '', '-1', 'a', 'rc1'))
+            for _ in range(n)]
+
+
+def main(n=20000, number=3):
+    tags = make_tags(n)
+    assert sorted(tags, key=functools.cmp_to_key(old_cmp)) == sort_versions(tags)
+
+    t_old = timeit.timeit(lambda: sorted(tags, key=functools.cmp_to_key(old_cmp)),
+                          number=number)
+
+    def cold():
+        parse_version.cache_clear()
+        return sort_versions(tags)
+
+    t_cold = timeit.timeit(cold, number=number)
+    t_warm = timeit.timeit(lambda: sort_versions(tags), number=number)
+    t_latest = timeit.timeit(lambda: latest_n(tags, 10), number=number)
+
+    print(f'{n} tags, {number} runs')
+    print(f'sorted + less_version:  {t_old:.4f}s')
+    print(f'sort_versions (cold):   {t_cold:.4f}s  x{t_old / t_cold:.1f}')
+    print(f'sort_versions (cached): {t_warm:.4f}s  x{t_old / t_warm:.1f}')
+    print(f'latest_n(10) (cached):  {t_latest:.4f}s')
+
+
+if __name__ == '__main__':
+    main()
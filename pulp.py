@@ -11,18 +11,33 @@
 import sys
 import re
 from wallix_packager.synchronizer import (run_synchronizer,
+                                          sync_submodules,
+                                          print_sync_report,
                                           argument_parser,
                                           read_gitconfig)
+from wallix_packager.error import print_error
+from wallix_packager.tracing import start_tracing, stop_tracing
 
 remove_prefix = re.compile('^modules/')
 gitconfig = read_gitconfig()
 parser = argument_parser(gitconfig, 'Synchronize submodules')
 args = parser.parse_intermixed_args()
-submodule_path = args.submodule[-1]
+
+if args.trace:
+    start_tracing()
 
 try:
-    run_synchronizer(gitconfig, submodule_path, args)
-except Exception as e:
-    from .wallix_packager.error import print_error
-    print_error(f'Setting {submodule_path} submodule failed: {e}')
-    sys.exit(1)
+    if args.all_submodules:
+        results = sync_submodules(gitconfig, args.submodule, args, args.jobs)
+        print_sync_report(results)
+        if any(result.error is not None for result in results):
+            sys.exit(1)
+    else:
+        submodule_path = args.submodule[-1]
+        try:
+            run_synchronizer(gitconfig, submodule_path, args)
+        except Exception as e:
+            print_error(f'Setting {submodule_path} submodule failed: {e}')
+            sys.exit(1)
+finally:
+    stop_tracing(args.trace)
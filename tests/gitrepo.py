@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Helpers for tests that need git repositories
+
+import os
+import subprocess
+
+for name in ('GIT_AUTHOR', 'GIT_COMMITTER'):
+    os.environ.setdefault(f'{name}_NAME', 'Packager Tests')
+    os.environ.setdefault(f'{name}_EMAIL', 'tests@example.com')
+
+
+def git(cwd: str, *args: str) -> str:
+    return subprocess.check_output(('git', *args), cwd=cwd, text=True,
+                                   stderr=subprocess.DEVNULL)
+
+
+def make_repo(path: str, nb_commits: int = 1, branch: str = 'master') -> None:
+    os.makedirs(path, exist_ok=True)
+    git(path, 'init', '-q', '-b', branch)
+    for i in range(nb_commits):
+        commit_file(path, 'file', f'{i}\n', f'commit {i}')
+
+
+def commit_file(path: str, filename: str, content: str, msg: str) -> str:
+    with open(os.path.join(path, filename), 'w') as f:
+        f.write(content)
+    git(path, 'add', filename)
+    git(path, 'commit', '-q', '-m', msg)
+    return git(path, 'rev-parse', 'HEAD').strip()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import time
+import subprocess
+import unittest
+from contextlib import redirect_stdout
+from wallix_packager.async_shell import (async_shell_cmd,
+                                         async_shell_run,
+                                         run_concurrently,
+                                         set_concurrency_limit,
+                                         DEFAULT_CONCURRENCY_LIMIT)
+
+class TestAsyncShell(unittest.TestCase):
+    def tearDown(self):
+        set_concurrency_limit(DEFAULT_CONCURRENCY_LIMIT)
+
+    def test_run_concurrently(self):
+        with redirect_stdout(io.StringIO()) as out:
+            results = run_concurrently(
+                async_shell_cmd(['echo', 'a b']),
+                None,
+                async_shell_run(['sh', '-c', 'exit 3'], check=False),
+            )
+        self.assertEqual(results[0], 'a b\n')
+        self.assertEqual(results[1], None)
+        self.assertEqual(results[2].returncode, 3)
+        self.assertIn("echo 'a b'", out.getvalue())
+
+    def test_errors(self):
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(subprocess.CalledProcessError):
+                run_concurrently(async_shell_cmd(['false']))
+            with self.assertRaises(subprocess.TimeoutExpired):
+                run_concurrently(async_shell_cmd(['sleep', '5'], timeout=0.1))
+            with self.assertRaises(subprocess.TimeoutExpired):
+                run_concurrently(async_shell_cmd(['sleep', '5'], timeout=0.2),
+                                 async_shell_cmd(['false']),
+                                 ordered_errors=True)
+
+    def test_concurrency_limit(self):
+        set_concurrency_limit(2)
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run_concurrently(*(async_shell_run(['sleep', '0.2']) for _ in range(4)))
+            elapsed = time.perf_counter() - start
+        self.assertGreaterEqual(elapsed, 0.4)
+        self.assertLess(elapsed, 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+import unittest
+from wallix_packager.config_loader import ConfigLoader
+from wallix_packager.error import PackagerError
+
+class TestConfigLoader(unittest.TestCase):
+    def test_origins(self):
+        origins = {}
+        config = ConfigLoader().load('tests/data/config1', {'X': '0'}, origins)
+        self.assertEqual(config, {'X': '3', 'VAR1': 'v1', 'VAR2': 'v2', 'VAR3': 'v3'})
+        self.assertEqual(origins, {
+            'X': os.path.abspath('tests/data/config3'),
+            'VAR1': os.path.abspath('tests/data/config1'),
+            'VAR2': os.path.abspath('tests/data/config2'),
+            'VAR3': os.path.abspath('tests/data/config3'),
+        })
+
+    def test_load_stream(self):
+        origins = {}
+        stream = io.StringIO('include tests/data/config3\nVAR1=v\n')
+        config = ConfigLoader().load_stream(stream, {}, origins)
+        self.assertEqual(config, {'X': '3', 'VAR3': 'v3', 'VAR1': 'v'})
+        self.assertEqual(origins, {
+            'X': os.path.abspath('tests/data/config3'),
+            'VAR3': os.path.abspath('tests/data/config3'),
+            'VAR1': '<stream>',
+        })
+
+    def test_include_cycle(self):
+        with tempfile.TemporaryDirectory() as d:
+            for name, content in (('a', 'include b\n'), ('b', 'X=1\ninclude c\n'),
+                                  ('c', 'include b\n')):
+                with open(f'{d}/{name}', 'w') as f:
+                    f.write(content)
+            with self.assertRaisesRegex(PackagerError, '/b -> .*/c -> .*/b$'):
+                ConfigLoader().load(f'{d}/a')
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(f'{d}/a', 'w') as f:
+                f.write('include b\nA=1\n')
+            with open(f'{d}/b', 'w') as f:
+                f.write('B=1\n')
+
+            loader = ConfigLoader()
+            self.assertEqual(loader.load(f'{d}/a'), {'A': '1', 'B': '1'})
+            entries = loader.entries(f'{d}/a')
+            self.assertIs(loader.entries(f'{d}/a'), entries)
+            self.assertEqual(loader.include_graph(), {f'{d}/a': (f'{d}/b',), f'{d}/b': ()})
+
+            with open(f'{d}/b', 'w') as f:
+                f.write('B=22\n')
+            self.assertEqual(loader.load(f'{d}/a'), {'A': '1', 'B': '22'})
+
+    def test_cache_diamond(self):
+        with tempfile.TemporaryDirectory() as d:
+            for name, content in (('a', 'include b\ninclude c\n'), ('b', 'include d\nB=1\n'),
+                                  ('c', 'C=1\ninclude d\n'), ('d', 'D=1\n')):
+                with open(f'{d}/{name}', 'w') as f:
+                    f.write(content)
+
+            loader = ConfigLoader()
+            self.assertEqual(loader.load(f'{d}/a'), {'B': '1', 'C': '1', 'D': '1'})
+
+            def write_d(content):
+                with open(f'{d}/d', 'w') as f:
+                    f.write(content)
+                # a distinct mtime even on coarse filesystems
+                st = os.stat(f'{d}/d')
+                os.utime(f'{d}/d', ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+            write_d('D=22\n')
+            self.assertEqual(loader.load(f'{d}/a'), {'B': '1', 'C': '1', 'D': '22'})
+
+            # d is refreshed through c only: b must not keep the old entries of d
+            write_d('D=333\n')
+            self.assertEqual(loader.entries(f'{d}/c'),
+                             (('C', '1', f'{d}/c'), ('D', '333', f'{d}/d')))
+            self.assertEqual(loader.load(f'{d}/a'), {'B': '1', 'C': '1', 'D': '333'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from gitrepo import git, make_repo, commit_file
+from wallix_packager.shell import git_last_tag
+from wallix_packager.describe_cache import (describe_cache,
+                                            find_git_dir,
+                                            read_head_sha,
+                                            DESCRIBE_CACHE_FILENAME)
+
+
+class TestDescribeCache(unittest.TestCase):
+    def setUp(self):
+        describe_cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmpdir.name, 'repo')
+        make_repo(self.repo)
+        git(self.repo, 'tag', '1.0.0')
+
+    def tearDown(self):
+        describe_cache.clear()
+        self.tmpdir.cleanup()
+
+    def last_tag(self, persistent=False):
+        with redirect_stdout(io.StringIO()) as out:
+            tag = git_last_tag(self.repo, persistent)
+        return tag, 'git describe' in out.getvalue()
+
+    def test_read_head_sha(self):
+        gitdir = find_git_dir(self.repo)
+        self.assertEqual(gitdir.gitdir, os.path.join(self.repo, '.git'))
+        sha = git(self.repo, 'rev-parse', 'HEAD').strip()
+        self.assertEqual(read_head_sha(gitdir), sha)
+        git(self.repo, 'pack-refs', '--all')
+        self.assertEqual(read_head_sha(gitdir), sha)
+        git(self.repo, 'checkout', '-q', '--detach')
+        self.assertEqual(read_head_sha(gitdir), sha)
+
+    def test_invalidation(self):
+        self.assertEqual(self.last_tag(), ('1.0.0', True))
+        self.assertEqual(self.last_tag(), ('1.0.0', False))
+
+        commit_file(self.repo, 'a', 'a', 'a')
+        self.assertEqual(self.last_tag(), ('1.0.0', True))
+        self.assertEqual(self.last_tag(), ('1.0.0', False))
+
+        git(self.repo, 'tag', '1.0.1')
+        self.assertEqual(self.last_tag(), ('1.0.1', True))
+
+        git(self.repo, 'pack-refs', '--all')
+        git(self.repo, 'tag', '-d', '1.0.1')
+        self.assertEqual(self.last_tag(), ('1.0.0', True))
+
+    def test_persistent(self):
+        self.assertEqual(self.last_tag(True), ('1.0.0', True))
+        self.assertTrue(os.path.exists(os.path.join(self.repo, '.git', DESCRIBE_CACHE_FILENAME)))
+        describe_cache.clear()
+        self.assertEqual(self.last_tag(True), ('1.0.0', False))
+        describe_cache.clear()
+        self.assertEqual(self.last_tag(), ('1.0.0', True))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from gitrepo import git, make_repo, commit_file
+from wallix_packager.git_session import GitSession
+from wallix_packager.shell import git_current_branch, git_tag_exists
+
+class TestGitSession(unittest.TestCase):
+    def test_session(self):
+        with tempfile.TemporaryDirectory() as d, redirect_stdout(io.StringIO()):
+            make_repo(d, branch='main')
+            sha = commit_file(d, 'VERSION', '1.2.3\n', 'Version 1.2.3')
+            git(d, 'tag', '1.2.3')
+            git(d, 'tag', '-a', '-m', 'annotated', 'v2')
+
+            with GitSession(d) as session:
+                self.assertEqual(session.resolve('HEAD'), sha)
+                self.assertEqual(session.resolve('1.2.3'), sha)
+                self.assertTrue(session.object_exists(sha))
+                self.assertFalse(session.object_exists('0' * 40))
+                self.assertFalse(session.object_exists('unknown'))
+                self.assertEqual(session.object_info('v2').type, 'tag')
+                self.assertEqual(session.read_blob('HEAD:VERSION'), b'1.2.3\n')
+                self.assertEqual(session.read_blob('HEAD:unknown'), None)
+                self.assertEqual(session.read_blob('HEAD'), None)
+                self.assertEqual(session.read_blob('1.2.3:file'), b'0\n')
+                self.assertEqual(sorted(session.tags()), ['1.2.3', 'v2'])
+                self.assertEqual(session.refs('refs/heads/'), {'refs/heads/main': sha})
+                self.assertEqual(session.current_branch(), 'main')
+
+                self.assertEqual(git_current_branch(session), 'main')
+                self.assertEqual(git_tag_exists('v2', session=session), (True, 'local'))
+
+                git(d, 'checkout', '-q', '--detach')
+                session.refresh_refs()
+                self.assertEqual(session.current_branch(), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
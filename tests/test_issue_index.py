@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from gitrepo import git, make_repo, commit_file
+from wallix_packager.issue_index import IssueIndex, extract_issues
+
+
+class TestIssueIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.tmpdir.name, 'repo')
+        self.cache_file = os.path.join(self.tmpdir.name, 'issues.json')
+        make_repo(self.repo)
+        git(self.repo, 'tag', '1.0.0')
+        commit_file(self.repo, 'a', 'a', 'fix WAB-12 and #3')
+        commit_file(self.repo, 'b', 'b', 'no issue')
+        git(self.repo, 'tag', '1.0.1')
+        commit_file(self.repo, 'c', 'c', 'WAB-2: again WAB-12')
+        git(self.repo, 'tag', '1.0.2')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_extract_issues(self):
+        self.assertEqual(extract_issues('WAB-1 #2 XWAB-3 (#4)'), ('WAB-1', '#2', '#4'))
+
+    def test_issues_between(self):
+        with redirect_stdout(io.StringIO()) as out:
+            index = IssueIndex(self.cache_file, cwd=self.repo)
+            self.assertEqual(index.issues_between('1.0.0', '1.0.1'), ['#3', 'WAB-12'])
+            self.assertEqual(len(index), 2)
+            self.assertEqual(index.issues_between('1.0.0'), ['#3', 'WAB-12', 'WAB-2'])
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.issues_between('1.0.1', '1.0.2'), ['WAB-12', 'WAB-2'])
+            index.save()
+        self.assertEqual(out.getvalue().count('git log'), 2)
+
+        with redirect_stdout(io.StringIO()) as out:
+            index = IssueIndex(self.cache_file, cwd=self.repo)
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.issues_between('1.0.0', '1.0.2'), ['#3', 'WAB-12', 'WAB-2'])
+        self.assertNotIn('git log', out.getvalue())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from wallix_packager.lazy_config import LazyConfig
+from wallix_packager.packager import normalize_config, replace_dict_all
+from wallix_packager.error import PackagerError
+
+class TestLazyConfig(unittest.TestCase):
+    def test_references(self):
+        config = LazyConfig({'A': 'a%B%%C%', 'B': '%C%b', 'C': 'c', 'D': '%UNKNOWN%'})
+        self.assertEqual(config['A'], 'acbc')
+        self.assertEqual(config['D'], '')
+        self.assertEqual(config.dependency_graph(),
+                         {'A': ('B', 'C'), 'B': ('C',), 'C': (), 'D': ('UNKNOWN',)})
+        config['C'] = 'x'
+        self.assertEqual(config['A'], 'axbx')
+
+    def test_lazy_value(self):
+        calls = []
+
+        def expensive(config):
+            calls.append(1)
+            return 'e'
+
+        config = LazyConfig({'A': 'a', 'E': expensive, 'F': '%E%'})
+        self.assertEqual(replace_dict_all('%A%', config), 'a')
+        self.assertEqual(calls, [])
+        self.assertEqual(replace_dict_all('%E% %F%', config), 'e e')
+        self.assertEqual(calls, [1])
+
+    def test_cycle(self):
+        config = LazyConfig({'A': '%B%', 'B': 'x%C%', 'C': '%A%'})
+        with self.assertRaisesRegex(PackagerError, 'A -> B -> C -> A'):
+            config['A']
+
+    def test_normalize_config(self):
+        calls = []
+
+        def dist_id(config):
+            calls.append(1)
+            return 'ubuntu'
+
+        config = LazyConfig({'DIST_ID': dist_id, 'TARGET_NAME': '+x'})
+        normalize_config(config)
+        self.assertEqual(calls, [])
+        self.assertEqual(dict(config), {
+            'DIST_ID': 'ubuntu',
+            'PKG_DISTRIBUTION': 'unstable',
+            'TARGET_NAME': '+x',
+        })
+
+        config = LazyConfig({'DIST_ID': dist_id})
+        normalize_config(config)
+        self.assertEqual(dict(config), {
+            'DIST_ID': 'ubuntu',
+            'PKG_DISTRIBUTION': 'unstable',
+            'TARGET_NAME': '+ubuntu',
+        })
+
+        config = LazyConfig({'DIST_ID': 'squeeze', 'PKG_DISTRIBUTION': 'buble'})
+        normalize_config(config)
+        self.assertEqual(dict(config), {
+            'DIST_ID': 'squeeze',
+            'PKG_DISTRIBUTION': 'buble',
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
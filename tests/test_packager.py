@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+import tempfile
 import unittest
+from wallix_packager.template import TemplateCache
+from wallix_packager.build_manifest import BuildManifest
 from wallix_packager.packager import (read_config,
+                                      collect_build_files,
+                                      expand_target_files,
+                                      output_build_paths,
+                                      make_target_config,
+                                      update_changelog,
+                                      write_build_files,
                                       replace_dict_all,
                                       normalize_config,
                                       extract_version_or_die,
@@ -37,6 +47,32 @@ class TestPackager(unittest.TestCase):
             'VAR3': 'v3'
         })
 
+    def test_make_target_config(self):
+        base_config = {'DIST_ID': 'ubuntu', 'X': '0'}
+        with open('tests/data/config2') as f:
+            config = make_target_config(base_config, f, ['X+=4'])
+        self.assertEqual(config, {
+            'DIST_ID': 'ubuntu',
+            'X': '24',
+            'VAR2': 'v2',
+            'PKG_DISTRIBUTION': 'unstable',
+            'TARGET_NAME': '+ubuntu',
+        })
+        self.assertEqual(base_config, {'DIST_ID': 'ubuntu', 'X': '0'})
+
+    def test_expand_target_files(self):
+        self.assertEqual(expand_target_files(['tests/data/config[23]', 'tests/data/config1',
+                                              'tests/data/config2']),
+                         ['tests/data/config2', 'tests/data/config3', 'tests/data/config1'])
+        with self.assertRaises(PackagerError):
+            expand_target_files(['tests/data/*.unknown'])
+
+    def test_output_build_paths(self):
+        self.assertEqual(output_build_paths('out', ['targets/debian', 'targets/ubuntu']),
+                         ['out/debian', 'out/ubuntu'])
+        with self.assertRaises(PackagerError):
+            output_build_paths('out', ['targets/debian', 'other/debian'])
+
     def test_normalize_config(self):
         config = {
             'DIST_ID': 'squeeze',
@@ -84,6 +120,86 @@ class TestPackager(unittest.TestCase):
             extract_version_or_die('^VERSION=(\d+\w+)', content, normalizer),
             ExtractedVersion('123a', (18, 22), content)
 
+    def test_incremental_build(self):
+        with tempfile.TemporaryDirectory() as d:
+            os.mkdir(f'{d}/tpl1')
+            os.mkdir(f'{d}/tpl2')
+            for path, content in (('tpl1/a', 'a=%A%'), ('tpl1/b', 'b=%B%'),
+                                  ('tpl1/c', 'c1'), ('tpl2/c', 'c2=%A%')):
+                with open(f'{d}/{path}', 'w') as f:
+                    f.write(content)
+
+            output = f'{d}/out'
+            template_dirs = [f'{d}/tpl1', f'{d}/tpl2']
+
+            def build(config, jobs=1):
+                manifest = BuildManifest(f'{d}/manifest', output)
+                build_files = collect_build_files(template_dirs, config, jobs)
+                write_build_files(build_files, output, TemplateCache(), manifest, jobs)
+                manifest.save()
+                return {name: os.stat(f'{output}/{name}').st_mtime_ns
+                        for name in sorted(os.listdir(output))}
+
+            def read(name):
+                with open(f'{output}/{name}') as f:
+                    return f.read()
+
+            mtimes1 = build({'A': '1', 'B': '2'})
+            self.assertEqual(list(mtimes1), ['a', 'b', 'c'])
+            self.assertEqual(read('c'), 'c2=1')
+
+            self.assertEqual(build({'A': '1', 'B': '2', 'C': '3'}), mtimes1)
+
+            mtimes2 = build({'A': '1', 'B': '3'})
+            self.assertEqual(mtimes2['a'], mtimes1['a'])
+            self.assertEqual(mtimes2['c'], mtimes1['c'])
+            self.assertEqual(read('b'), 'b=3')
+
+            os.remove(f'{d}/tpl1/b')
+            self.assertEqual(list(build({'A': '1', 'B': '3'})), ['a', 'c'])
+
+            build({'A': '4', 'B': '3'}, jobs=4)
+            self.assertEqual(read('a'), 'a=4')
+            self.assertEqual(read('c'), 'c2=4')
+
+    def test_write_build_files_passthrough(self):
+        with tempfile.TemporaryDirectory() as d:
+            os.mkdir(f'{d}/tpl')
+            binary = bytes(range(256)) * 4
+            with open(f'{d}/tpl/bin', 'wb') as f:
+                f.write(binary)
+            with open(f'{d}/tpl/rules', 'w') as f:
+                f.write('#!/usr/bin/make -f\n%A%\n')
+            os.chmod(f'{d}/tpl/rules', 0o755)
+
+            cache = TemplateCache()
+            self.assertIsNone(cache.load(f'{d}/tpl/bin')[1])
+
+            for copy_mode in ('copy', 'reflink', 'hardlink'):
+                output = f'{d}/out-{copy_mode}'
+                build_files = collect_build_files([f'{d}/tpl'], {'A': 'a'})
+                write_build_files(build_files, output, cache, copy_mode=copy_mode)
+                with open(f'{output}/bin', 'rb') as f:
+                    self.assertEqual(f.read(), binary)
+                with open(f'{output}/rules') as f:
+                    self.assertEqual(f.read(), '#!/usr/bin/make -f\na\n')
+                self.assertEqual(os.stat(f'{output}/rules').st_mode & 0o777, 0o755)
+
+    def test_update_changelog(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = f'{d}/changelog'
+            with open(path, 'w') as f:
+                f.write('old entry\n' * 1000)
+            os.chmod(path, 0o640)
+            update_changelog(path, 'new entry\n')
+            with open(path) as f:
+                self.assertEqual(f.read(), 'new entry\n' + 'old entry\n' * 1000)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(d), ['changelog'])
+
+            with self.assertRaises(FileNotFoundError):
+                update_changelog(f'{d}/unknown', 'new entry\n')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import stat
+import tempfile
+import unittest
+from wallix_packager.error import PackagerError
+from wallix_packager.version_scanner import VersionRule
+from wallix_packager.reference_updater import update_references
+
+
+class TestReferenceUpdater(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = self.tmpdir.name
+        self.files = {
+            'Dockerfile': 'FROM base\nARG APP_VERSION=1.0.0\r\nLABEL version="1.0.0"\n',
+            'cmake/CMakeLists.txt': 'project(app VERSION 1.0.0)\n',
+            'up-to-date.json': '{"version": "2.0.0"}\n',
+            'other.txt': 'version 1.0.0\n',
+        }
+        for filename, content in self.files.items():
+            path = os.path.join(self.root, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', newline='') as f:
+                f.write(content)
+        os.chmod(os.path.join(self.root, 'Dockerfile'), 0o755)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read(self, filename):
+        with open(os.path.join(self.root, filename), newline='') as f:
+            return f.read()
+
+    def mtime(self, filename):
+        return os.stat(os.path.join(self.root, filename)).st_mtime_ns
+
+    rules = [
+        VersionRule('Dockerfile', r'APP_VERSION=(\S+)'),
+        VersionRule('Dockerfile', r'version="([^"]+)"'),
+        VersionRule('*.txt', r'VERSION (\d[^)]*)'),
+        VersionRule('*.json', r'"version": "([^"]+)"'),
+    ]
+
+    def test_update_references(self):
+        mtime = self.mtime('up-to-date.json')
+        updates = update_references(self.root, self.rules, '2.0.0')
+
+        self.assertEqual([u.filename for u in updates],
+                         ['Dockerfile', 'cmake/CMakeLists.txt', 'up-to-date.json'])
+        dockerfile = updates[0]
+        self.assertEqual([(s.position, s.old_text, s.new_text) for s in dockerfile.spans],
+                         [((26, 31), '1.0.0', '2.0.0'), ((48, 53), '1.0.0', '2.0.0')])
+        self.assertEqual(updates[2].spans, [])
+        self.assertEqual(updates[2].matches, 1)
+
+        self.assertEqual(self.read('Dockerfile'),
+                         'FROM base\nARG APP_VERSION=2.0.0\r\nLABEL version="2.0.0"\n')
+        self.assertEqual(self.read('cmake/CMakeLists.txt'), 'project(app VERSION 2.0.0)\n')
+        self.assertEqual(self.read('other.txt'), self.files['other.txt'])
+        self.assertEqual(self.mtime('up-to-date.json'), mtime)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.root, 'Dockerfile')).st_mode),
+                         0o755)
+
+    def test_dry_run(self):
+        updates = update_references(self.root, self.rules, '3.0.0', dry_run=True)
+        self.assertEqual(len(updates[0].spans), 2)
+        self.assertEqual(self.read('Dockerfile'), self.files['Dockerfile'])
+
+    def test_not_found(self):
+        rules = self.rules + [VersionRule('*.cfg', r'version=(.*)')]
+        with self.assertRaisesRegex(PackagerError, r'\*\.cfg'):
+            update_references(self.root, rules, '2.0.0', jobs=2)
+        # nothing is written
+        self.assertEqual(self.read('Dockerfile'), self.files['Dockerfile'])
+
+    def test_no_group(self):
+        rules = self.rules + [VersionRule('*.txt', r'version \S+')]
+        with self.assertRaisesRegex(PackagerError, r'glob = \*\.txt, pattern = version'):
+            update_references(self.root, rules, '2.0.0')
+        self.assertEqual(self.read('Dockerfile'), self.files['Dockerfile'])
+
+    def test_optional_group(self):
+        with open(os.path.join(self.root, 'VERSION'), 'w') as f:
+            f.write('VERSION=1.0\nX\nX3\n')
+        rules = [VersionRule('VERSION', r'VERSION=([\d.]+)'),
+                 VersionRule('VERSION', r'X(\d)?')]
+        updates = update_references(self.root, rules, '2.0')
+        self.assertEqual([(s.position, s.old_text) for s in updates[0].spans],
+                         [((8, 11), '1.0'), ((15, 16), '3')])
+        self.assertEqual(self.read('VERSION'), 'VERSION=2.0\nX\nX2.0\n')
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from gitrepo import git, make_repo
+from wallix_packager.error import PackagerError
+from wallix_packager.repo_updater import run_update_repos, print_update_report
+from wallix_packager.runner import RecordingRunner, set_runner
+from wallix_packager.tracing import start_tracing, stop_tracing
+
+
+def update_version():
+    with open('file', 'w') as f:
+        f.write(f'VERSION={os.path.basename(os.getcwd())}\n')
+
+
+class TestRepoUpdater(unittest.TestCase):
+    def test_run_update_repos(self):
+        with tempfile.TemporaryDirectory() as d:
+            repos = []
+            for name in ('repo1', 'repo2'):
+                origin = os.path.join(d, f'{name}.git')
+                make_repo(os.path.join(d, 'src'))
+                git(d, 'clone', '-q', '--bare', 'src', origin)
+                git(d, 'clone', '-q', origin, name)
+                shutil.rmtree(os.path.join(d, 'src'))
+                repos.append((os.path.join(d, name), origin))
+            bad_repo = os.path.join(d, 'not-a-repo')
+            os.mkdir(bad_repo)
+
+            cwd = os.getcwd()
+            results = run_update_repos(update_version,
+                                       [path for path, _ in repos] + [bad_repo],
+                                       'updated', 'master', True, 'update version', jobs=2)
+            self.assertEqual(os.getcwd(), cwd)
+
+            self.assertEqual([r.repo_path for r in results],
+                             [path for path, _ in repos] + [bad_repo])
+            for result, (path, origin) in zip(results, repos):
+                self.assertIsNone(result.error)
+                self.assertIn(f'+VERSION={os.path.basename(path)}', result.diff)
+                self.assertEqual(git(origin, 'log', '-1', '--pretty=%s'), 'update version\n')
+            self.assertIsNotNone(results[2].error)
+            self.assertIn('git fetch', results[2].log)
+
+            with redirect_stdout(io.StringIO()) as out:
+                print_update_report(results)
+            self.assertIn('+VERSION=repo2', out.getvalue())
+            self.assertIn('failed', out.getvalue())
+
+    def test_run_update_repos_trace(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'not-a-repo')
+            os.mkdir(path)
+            start_tracing()
+            try:
+                results = run_update_repos(update_version, [path], 'updated', 'master',
+                                           True, 'update version')
+            finally:
+                tracer = stop_tracing()
+            self.assertIsNotNone(results[0].error)
+            events = [e for e in tracer.events if e['name'] == 'update repository']
+            self.assertEqual(len(events), 1)
+            self.assertEqual(events[0]['args']['repo'], path)
+            self.assertIn('error', events[0]['args'])
+            self.assertNotEqual(events[0]['pid'], os.getpid())
+
+    def test_run_update_repos_recording(self):
+        with tempfile.TemporaryDirectory() as d:
+            previous = set_runner(RecordingRunner(os.path.join(d, 'cassette.json')))
+            try:
+                with self.assertRaises(PackagerError):
+                    run_update_repos(update_version, [d], 'updated', 'master',
+                                     True, 'update version')
+            finally:
+                set_runner(previous)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import json
+import tempfile
+import subprocess
+import unittest
+from contextlib import redirect_stdout
+from wallix_packager.shell import shell_cmd, shell_run, shell_lines
+from wallix_packager.async_shell import async_shell_cmd, run_concurrently
+from wallix_packager.runner import (set_runner,
+                                    runner_from_environment,
+                                    RecordingRunner,
+                                    ReplayRunner,
+                                    ReplayError,
+                                    SubprocessRunner)
+from wallix_packager.error import PackagerError
+
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cassette = os.path.join(self.tmpdir.name, 'cassette.json')
+        self.marker = os.path.join(self.tmpdir.name, 'marker')
+
+    def tearDown(self):
+        set_runner(None)
+        self.tmpdir.cleanup()
+
+    def record(self):
+        recorder = RecordingRunner(self.cassette)
+        set_runner(recorder)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(shell_cmd(['sh', '-c', f'echo abc; touch {self.marker}']), 'abc\n')
+            self.assertEqual(shell_run(['sh', '-c', 'exit 2'], check=False).returncode, 2)
+            with self.assertRaises(subprocess.CalledProcessError):
+                shell_cmd(['sh', '-c', 'echo err; exit 1'])
+        recorder.save()
+        os.unlink(self.marker)
+
+    def test_record_replay(self):
+        self.record()
+
+        with open(self.cassette) as f:
+            interactions = json.load(f)['interactions']
+        self.assertEqual([(i['kind'], i['returncode']) for i in interactions],
+                         [('output', 0), ('run', 2), ('output', 1)])
+
+        replay = ReplayRunner(self.cassette)
+        set_runner(replay)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(shell_cmd(['sh', '-c', f'echo abc; touch {self.marker}']), 'abc\n')
+            self.assertEqual(shell_run(['sh', '-c', 'exit 2'], check=False).returncode, 2)
+            with self.assertRaises(subprocess.CalledProcessError) as cm:
+                shell_cmd(['sh', '-c', 'echo err; exit 1'])
+        self.assertEqual(cm.exception.output, 'err\n')
+        self.assertTrue(replay.is_finished())
+        # nothing is executed
+        self.assertFalse(os.path.exists(self.marker))
+        self.assertAlmostEqual(replay.command_time,
+                               sum(i['duration'] for i in interactions))
+
+    def test_replay_mismatch(self):
+        self.record()
+        set_runner(ReplayRunner(self.cassette))
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(ReplayError):
+                shell_cmd(['echo', 'other'])
+
+    def test_replay_cwd(self):
+        dirs = [os.path.join(self.tmpdir.name, name) for name in ('s1', 's2')]
+        set_runner(RecordingRunner(self.cassette))
+        with redirect_stdout(io.StringIO()):
+            for d in dirs:
+                os.mkdir(d)
+                self.assertEqual(shell_cmd(['pwd'], cwd=d), f'{d}\n')
+        set_runner(None).save()
+
+        set_runner(ReplayRunner(self.cassette))
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(shell_cmd(['pwd'], cwd=dirs[1]), f'{dirs[1]}\n')
+            self.assertEqual(shell_cmd(['pwd'], cwd=dirs[0]), f'{dirs[0]}\n')
+            with self.assertRaisesRegex(ReplayError, 'in None'):
+                shell_cmd(['pwd'])
+
+    def test_replay_unordered(self):
+        set_runner(RecordingRunner(self.cassette))
+        with redirect_stdout(io.StringIO()):
+            shell_cmd(['echo', 'a'])
+            shell_cmd(['echo', 'b'])
+        set_runner(None).save()
+
+        replay = ReplayRunner(self.cassette)
+        set_runner(replay)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(run_concurrently(async_shell_cmd(['echo', 'b']),
+                                              async_shell_cmd(['echo', 'a'])),
+                             ['b\n', 'a\n'])
+        self.assertTrue(replay.is_finished())
+
+    def test_shell_lines(self):
+        with redirect_stdout(io.StringIO()):
+            lines = shell_lines(['yes', 'abc'])
+            self.assertEqual([next(lines) for _ in range(3)], ['abc'] * 3)
+            # kill the process
+            lines.close()
+
+            lines = shell_lines(['sh', '-c', 'echo a; echo b; exit 3'])
+            self.assertEqual(next(lines), 'a')
+            self.assertEqual(next(lines), 'b')
+            with self.assertRaises(subprocess.CalledProcessError):
+                next(lines)
+
+    def test_record_replay_lines(self):
+        set_runner(RecordingRunner(self.cassette))
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(list(shell_lines(['printf', 'a\\nb\\n'])), ['a', 'b'])
+        set_runner(None).save()
+
+        set_runner(ReplayRunner(self.cassette))
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(list(shell_lines(['printf', 'a\\nb\\n'])), ['a', 'b'])
+
+    def test_runner_from_environment(self):
+        env = os.environ.copy()
+        try:
+            os.environ.pop('PACKAGER_RUNNER', None)
+            self.assertIsInstance(runner_from_environment(), SubprocessRunner)
+            os.environ['PACKAGER_RUNNER'] = 'replay'
+            os.environ.pop('PACKAGER_CASSETTE', None)
+            with self.assertRaises(PackagerError):
+                runner_from_environment()
+            os.environ['PACKAGER_RUNNER'] = 'bad'
+            with self.assertRaises(PackagerError):
+                runner_from_environment()
+        finally:
+            os.environ.clear()
+            os.environ.update(env)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from wallix_packager.ssh_pool import SSHPool
+from wallix_packager.synchronizer import fetch_clone
+
+# log arguments then run the command (last argument) locally
+FAKE_SSH = '''#!/bin/sh
+echo "$*" >> "$FAKE_SSH_LOG"
+for last; do :; done
+case " $* " in
+  *" -M "*) exit ${FAKE_SSH_MASTER_EXIT:-0} ;;
+  *" -O "*) exit 0 ;;
+esac
+exec sh -c "$last"
+'''
+
+
+class TestSSHPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ssh = os.path.join(self.tmpdir.name, 'ssh')
+        self.log = os.path.join(self.tmpdir.name, 'log')
+        with open(self.ssh, 'w') as f:
+            f.write(FAKE_SSH)
+        os.chmod(self.ssh, 0o755)
+        os.environ['FAKE_SSH_LOG'] = self.log
+
+    def tearDown(self):
+        del os.environ['FAKE_SSH_LOG']
+        self.tmpdir.cleanup()
+
+    def calls(self):
+        with open(self.log) as f:
+            return f.read().splitlines()
+
+    def test_pool(self):
+        with redirect_stdout(io.StringIO()) as out:
+            with SSHPool(self.ssh) as pool:
+                self.assertEqual(pool.run('u@host1', 'echo a'), 'a\n')
+                self.assertEqual(pool.run('u@host1', 'echo b'), 'b\n')
+                fetch_clone('sub', self.tmpdir.name, 'u@host2', 'echo c', pool)
+                control_dir = os.path.dirname(pool.control_path('u@host1'))
+                self.assertTrue(os.path.isdir(control_dir))
+            self.assertFalse(os.path.exists(control_dir))
+        self.assertIn('c\n', out.getvalue())
+
+        calls = self.calls()
+        masters = [call for call in calls if call.startswith('-M ')]
+        exits = [call for call in calls if ' -O exit ' in call]
+        commands = [call for call in calls if 'ControlMaster=no' in call]
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(len(masters), 2)
+        self.assertEqual(len(exits), 2)
+        self.assertEqual(len(commands), 3)
+        self.assertTrue(masters[0].endswith('u@host1'))
+        self.assertTrue(masters[1].endswith('u@host2'))
+        host1_socket = masters[0].split('ControlPath=')[1].split()[0]
+        self.assertIn(f'ControlPath={host1_socket}', commands[0])
+        self.assertIn(f'ControlPath={host1_socket}', commands[1])
+
+    def test_master_failure(self):
+        os.environ['FAKE_SSH_MASTER_EXIT'] = '255'
+        try:
+            with redirect_stdout(io.StringIO()) as out:
+                with SSHPool(self.ssh) as pool:
+                    self.assertEqual(pool.run('u@host1', 'echo a'), 'a\n')
+                    self.assertEqual(pool.run('u@host1', 'echo b'), 'b\n')
+        finally:
+            del os.environ['FAKE_SSH_MASTER_EXIT']
+        self.assertIn('separate connections', out.getvalue())
+
+        calls = self.calls()
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(calls[0].startswith('-M '))
+        self.assertIn('ControlPersist=60', calls[0])
+        self.assertEqual(calls[1:], ['u@host1 echo a', 'u@host1 echo b'])
@@ -1,8 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
+import os
+import argparse
+import tempfile
 import unittest
-from wallix_packager.synchronizer import parse_gitconfig, explode_git_url
+from contextlib import redirect_stdout
+from gitrepo import git, make_repo, commit_file
+from wallix_packager.synchronizer import (parse_gitconfig,
+                                          explode_git_url,
+                                          sync_submodules,
+                                          set_commit,
+                                          set_tag,
+                                          set_branch,
+                                          FetchOptions,
+                                          print_sync_report)
 
 class TestPulp(unittest.TestCase):
     def test_parse_gitconfig(self):
@@ -42,6 +55,101 @@ class TestPulp(unittest.TestCase):
 
         self.assertEqual(explode_git_url('user1@gitlab.com:/program_options'), None)
 
+    def test_sync_submodules(self):
+        with tempfile.TemporaryDirectory() as d:
+            origin = os.path.join(d, 'origin')
+            make_repo(origin)
+            git(origin, 'tag', '1.0.0')
+            submodules = [os.path.join(d, name) for name in ('sub1', 'sub2')]
+            for path in submodules:
+                git(d, 'clone', '-q', origin, path)
+            sha = commit_file(origin, 'file', 'new', 'new')
+            git(origin, 'tag', '1.0.1')
+
+            args = argparse.Namespace(sync_hook='', branch=None, tag='1.0.1', commit_hash=None,
+                                      depth=None, filter=None)
+            cwd = os.getcwd()
+            missing = os.path.join(d, 'missing')
+            with redirect_stdout(io.StringIO()) as out:
+                results = sync_submodules({}, [*submodules, missing], args, jobs=3)
+                print_sync_report(results)
+            self.assertEqual(os.getcwd(), cwd)
+
+            self.assertEqual([r.submodule for r in results], [*submodules, missing])
+            self.assertEqual([r.error is None for r in results], [True, True, False])
+            for path in submodules:
+                self.assertEqual(git(path, 'rev-parse', 'HEAD').strip(), sha)
+            self.assertIn('failed', out.getvalue())
+
+    def test_set_fetch_only_missing(self):
+        with tempfile.TemporaryDirectory() as d:
+            origin = os.path.join(d, 'origin')
+            clone = os.path.join(d, 'clone')
+            make_repo(origin)
+            old_sha = git(origin, 'rev-parse', 'HEAD').strip()
+            git(origin, 'tag', '1.0.0')
+            git(d, 'clone', '-q', origin, clone)
+            new_sha = commit_file(origin, 'file', 'new', 'new')
+            git(origin, 'tag', '1.0.1')
+            git(origin, 'branch', 'other')
+
+            def run(func, *args):
+                with redirect_stdout(io.StringIO()) as out:
+                    func(clone, *args)
+                return [line for line in out.getvalue().split('\n') if 'git fetch' in line]
+
+            self.assertEqual(run(set_tag, '1.0.0'), [])
+            self.assertEqual(git(clone, 'rev-parse', 'HEAD').strip(), old_sha)
+            self.assertEqual(run(set_commit, old_sha), [])
+
+            fetches = run(set_tag, '1.0.1')
+            self.assertEqual(len(fetches), 1)
+            self.assertIn('refs/tags/1.0.1:refs/tags/1.0.1', fetches[0])
+            self.assertEqual(git(clone, 'rev-parse', 'HEAD').strip(), new_sha)
+
+            git(clone, 'reset', '-q', '--hard', old_sha)
+            self.assertEqual(run(set_commit, new_sha), [])
+
+            fetches = run(set_branch, 'other')
+            self.assertEqual(len(fetches), 1)
+            self.assertIn('refs/heads/other:refs/remotes/origin/other', fetches[0])
+            self.assertEqual(git(clone, 'rev-parse', 'HEAD').strip(), new_sha)
+
+            last_sha = commit_file(origin, 'file', 'last', 'last')
+            fetches = run(set_commit, last_sha)
+            self.assertIn(f'git fetch origin {last_sha}', fetches[0])
+            self.assertEqual(git(clone, 'rev-parse', 'HEAD').strip(), last_sha)
+
+    def test_shallow_and_partial(self):
+        with tempfile.TemporaryDirectory() as d:
+            origin = os.path.join(d, 'origin')
+            make_repo(origin, nb_commits=6)
+            git(origin, 'config', 'uploadpack.allowFilter', 'true')
+            first_sha = git(origin, 'rev-list', '--max-parents=0', 'HEAD').strip()
+            git(origin, 'tag', '1.0.0')
+
+            def init(name):
+                path = os.path.join(d, name)
+                make_repo(path, nb_commits=0)
+                git(path, 'remote', 'add', 'origin', origin)
+                return path
+
+            def head(path):
+                return git(path, 'rev-parse', 'HEAD').strip()
+
+            with redirect_stdout(io.StringIO()):
+                shallow = init('shallow')
+                set_tag(shallow, '1.0.0', options=FetchOptions(depth=1, filter='blob:none'))
+                self.assertEqual(head(shallow), head(origin))
+                self.assertEqual(git(shallow, 'rev-list', '--count', 'HEAD'), '1\n')
+                with open(os.path.join(shallow, 'file')) as f:
+                    self.assertEqual(f.read(), '5\n')
+
+                # an abbreviated hash cannot be fetched: deepened until found,
+                # also without --depth since the repository is already shallow
+                set_commit(shallow, first_sha[:10])
+                self.assertEqual(head(shallow), first_sha)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import tempfile
+import subprocess
+import unittest
+from contextlib import redirect_stdout
+from gitrepo import git, make_repo, commit_file
+from wallix_packager.tag import git_push_version
+from wallix_packager.error import PackagerError
+
+
+class TestGitPushVersion(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.remote = os.path.join(self.tmpdir.name, 'remote.git')
+        self.repo = os.path.join(self.tmpdir.name, 'repo')
+        make_repo(self.repo)
+        git(self.tmpdir.name, 'clone', '-q', '--bare', self.repo, self.remote)
+        git(self.repo, 'remote', 'add', 'origin', self.remote)
+        with open(os.path.join(self.repo, 'file'), 'w') as f:
+            f.write('1.0.1\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_push(self):
+        with redirect_stdout(io.StringIO()) as out:
+            timings = git_push_version('1.0.1', cwd=self.repo)
+        self.assertEqual([t.step for t in timings], ['commit', 'push', 'verify'])
+        self.assertEqual(out.getvalue().count('git push'), 1)
+        self.assertIn('--atomic', out.getvalue())
+
+        sha = git(self.repo, 'rev-parse', 'HEAD')
+        self.assertEqual(git(self.remote, 'rev-parse', 'refs/heads/master'), sha)
+        self.assertEqual(git(self.remote, 'rev-parse', 'refs/tags/1.0.1'), sha)
+        self.assertEqual(git(self.remote, 'log', '-1', '--pretty=%s', 'master'),
+                         'Version 1.0.1\n')
+
+    def test_atomic(self):
+        # the remote branch has diverged: the tag must not be pushed either
+        clone = os.path.join(self.tmpdir.name, 'clone')
+        git(self.tmpdir.name, 'clone', '-q', self.remote, clone)
+        commit_file(clone, 'other', 'x', 'other')
+        git(clone, 'push', '-q', 'origin', 'master')
+
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(subprocess.CalledProcessError):
+                git_push_version('1.0.1', cwd=self.repo)
+        self.assertEqual(git(self.remote, 'tag', '--list'), '')
+
+    def test_verify(self):
+        # the remote removes the tag after the push
+        hook = os.path.join(self.remote, 'hooks', 'post-receive')
+        with open(hook, 'w') as f:
+            f.write('#!/bin/sh\ngit update-ref -d refs/tags/1.0.1\n')
+        os.chmod(hook, 0o755)
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaisesRegex(PackagerError, 'refs/tags/1.0.1 is missing'):
+                git_push_version('1.0.1', cwd=self.repo)
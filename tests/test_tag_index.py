@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import tempfile
+import unittest
+from wallix_packager.tag_index import TagIndex, parse_ls_remote_tags
+
+class TestTagIndex(unittest.TestCase):
+    def test_parse_ls_remote_tags(self):
+        self.assertEqual(parse_ls_remote_tags([
+            '7b997fa58cd40848273c4b1469c787b0cdd69e84\trefs/tags/9.1.33',
+            'dd3d667d68906c77e6fc47b5b8d19ff12fc47104\trefs/tags/9.1.33^{}',
+            'dd3d667d68906c77e6fc47b5b8d19ff12fc47104\trefs/tags/9.1.35\n',
+            'dd3d667d68906c77e6fc47b5b8d19ff12fc47104\trefs/heads/master',
+            '',
+        ]), ['9.1.33', '9.1.35'])
+
+    def test_queries(self):
+        index = TagIndex(local_tags=['9.1.2', '9.0.10', 'old-release'],
+                         remote_tags=['9.1.10', '9.1.2', '10.0.1', '9.2.0'])
+        self.assertEqual(index.exists('9.1.2'), (True, 'local'))
+        self.assertEqual(index.exists('old-release'), (True, 'local'))
+        self.assertEqual(index.exists('9.1.10'), (True, 'remote'))
+        self.assertEqual(index.exists('9.1.11'), (False, ''))
+        self.assertEqual(index.tags(), ['9.0.10', '9.1.2', '9.1.10', '9.2.0', '10.0.1'])
+        self.assertEqual(index.predecessor('9.1.10'), '9.1.2')
+        self.assertEqual(index.predecessor('9.1.3'), '9.1.2')
+        self.assertEqual(index.predecessor('9.0.10'), None)
+        self.assertEqual(index.successor('9.1.2'), '9.1.10')
+        self.assertEqual(index.successor('10.0.1'), None)
+        self.assertEqual(index.latest_in_series('9.1'), '9.1.10')
+        self.assertEqual(index.latest_in_series('9'), '9.2.0')
+        self.assertEqual(index.latest_in_series('9.3'), None)
+        self.assertEqual(index.latest_in_series('10.0'), '10.0.1')
+
+    def test_remote_cache(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump({'remote': 'origin', 'time': time.time(), 'tags': ['1.0', '2.0']}, f)
+            f.flush()
+            index = TagIndex(cache_file=f.name, local_tags=[])
+            self.assertEqual(index.exists('2.0'), (True, 'remote'))
+            self.assertEqual(index.tags(), ['1.0', '2.0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
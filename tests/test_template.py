@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from wallix_packager.template import Template, TemplateCache, compile_template
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_template(self):
+        self.assertEqual(compile_template('a %A% b %B%%A%'),
+                         Template(('a ', ' b ', '', ''), ('A', 'B', 'A')))
+        self.assertEqual(compile_template('abc % %a% %'), Template(('abc % %a% %',), ()))
+
+    def test_render(self):
+        template = compile_template('a %A% aa %AA% %B% a %A%%D% aa')
+        self.assertEqual(template.render({'A': 'x', 'AA': 'y', 'B': 'z'}),
+                         'a x aa y z a x aa')
+
+    def test_template_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = f'{d}/tpl'
+            cache_file = f'{d}/cache.json'
+            with open(path, 'w') as f:
+                f.write('v=%V%\n')
+
+            cache = TemplateCache(cache_file)
+            self.assertEqual(cache.get(path).render({'V': '1'}), 'v=1\n')
+            cache.save()
+            self.assertTrue(os.path.exists(cache_file))
+
+            cache = TemplateCache(cache_file)
+            self.assertEqual(cache.get(path), Template(('v=', '\n'), ('V',)))
+
+            with open(path, 'w') as f:
+                f.write('w=%W%\n')
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(cache.get(path).render({'W': '2'}), 'w=2\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from wallix_packager.shell import shell_cmd
+from wallix_packager.tracing import span, traced, start_tracing, stop_tracing, is_tracing
+
+class TestTracing(unittest.TestCase):
+    def tearDown(self):
+        stop_tracing()
+
+    def test_disabled(self):
+        self.assertFalse(is_tracing())
+        with span('x', a=1) as s:
+            s.set(b=2)
+        self.assertIs(span('y'), span('z'))
+
+    def test_trace_file(self):
+        @traced()
+        def f():
+            with span('inner', n=1) as s:
+                s.set(m=2)
+                with redirect_stdout(io.StringIO()):
+                    shell_cmd(['true'])
+
+        start_tracing()
+        f()
+        with self.assertRaises(ValueError):
+            with span('error'):
+                raise ValueError('oops')
+
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as tmp:
+            stop_tracing(tmp.name)
+            events = json.load(tmp)['traceEvents']
+
+        self.assertEqual([(e['name'], e['ph'], e['args']) for e in events], [
+            ('shell_cmd', 'X', {'argv': ['true'], 'exit_code': 0}),
+            ('inner', 'X', {'n': 1, 'm': 2}),
+            ('TestTracing.test_trace_file.<locals>.f', 'X', {}),
+            ('error', 'X', {'error': 'ValueError: oops'}),
+        ])
+        self.assertEqual(events[0]['cat'], 'shell')
+        self.assertLessEqual(events[2]['ts'], events[1]['ts'])
+        self.assertGreaterEqual(events[2]['dur'], events[1]['dur'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import unittest
-from wallix_packager.version import less_version
+from wallix_packager.version import (less_version,
+                                     parse_version,
+                                     sort_versions,
+                                     max_version,
+                                     latest_n)
 
 class TestVersion(unittest.TestCase):
     def test_less_version(self):
@@ -16,6 +20,24 @@ class TestVersion(unittest.TestCase):
         self.assertEqual(less_version('2.a', '2.b'), True)
         self.assertEqual(less_version('2.b', '2.a'), False)
 
+    def test_parse_version(self):
+        v = parse_version('v1.2-3rc')
+        self.assertEqual(v.key, (1, 2, 3, 0, 0, 'rc'))
+        self.assertEqual(str(v), 'v1.2-3rc')
+        self.assertIs(parse_version('v1.2-3rc'), v)
+        self.assertEqual(parse_version('1.2'), parse_version('1.2.0'))
+        self.assertLess(parse_version('1.2'), parse_version('1.10'))
+        self.assertGreaterEqual(parse_version('2.b'), parse_version('2.a'))
+        with self.assertRaises(ValueError):
+            parse_version('abc')
+
+    def test_sort_versions(self):
+        tags = ['1.10.0', '1.2.0', '1.2.0-1', '0.9', '1.2.0a', '2.0']
+        self.assertEqual(sort_versions(tags),
+                         ['0.9', '1.2.0', '1.2.0a', '1.2.0-1', '1.10.0', '2.0'])
+        self.assertEqual(max_version(tags), '2.0')
+        self.assertEqual(latest_n(tags, 3), ['2.0', '1.10.0', '1.2.0-1'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from wallix_packager import version_scanner
+from wallix_packager.version_scanner import VersionRule, scan_versions, group_by_version
+
+class TestVersionScanner(unittest.TestCase):
+    def test_scan_versions(self):
+        with tempfile.TemporaryDirectory() as d:
+            os.makedirs(f'{d}/a/b')
+            os.makedirs(f'{d}/.git')
+            files = {
+                'VERSION': 'VERSION=1.2.3\nVERSION=0.0.0\n',
+                'a/VERSION': 'x\nVERSION = "1.2.3"\n',
+                'a/b/VERSION': '#' * 100 + '\nVERSION 1.2.4\n',
+                'a/b/CMakeLists.txt': 'project(p VERSION 1.2.3)\n',
+                'a/b/other': 'VERSION=9\n',
+                '.git/VERSION': 'VERSION=9\n',
+            }
+            for path, content in files.items():
+                with open(f'{d}/{path}', 'w') as f:
+                    f.write(content)
+
+            old_threshold = version_scanner.MMAP_THRESHOLD
+            version_scanner.MMAP_THRESHOLD = 64
+            try:
+                rules = [
+                    VersionRule('*VERSION', r'VERSION\b\s*=?\s*"?([\d.]+)'),
+                    VersionRule('*/CMakeLists.txt', r'project\([^)]*VERSION ([\d.]+)'),
+                ]
+                results = scan_versions(d, rules, jobs=2)
+            finally:
+                version_scanner.MMAP_THRESHOLD = old_threshold
+
+            self.assertEqual([(r.filename, r.version, r.position)
+                              for r in results], [
+                ('VERSION', '1.2.3', (8, 13)),
+                ('a/VERSION', '1.2.3', (13, 18)),
+                ('a/b/CMakeLists.txt', '1.2.3', (18, 23)),
+                ('a/b/VERSION', '1.2.4', (109, 114)),
+            ])
+            self.assertEqual({version: [r.filename for r in group]
+                              for version, group in group_by_version(results).items()}, {
+                '1.2.3': ['VERSION', 'a/VERSION', 'a/b/CMakeLists.txt'],
+                '1.2.4': ['a/b/VERSION'],
+            })
+
+
+if __name__ == '__main__':
+    unittest.main()
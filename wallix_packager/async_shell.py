@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: asyncio counterpart of shell_cmd / shell_run
+##
+
+import asyncio
+import subprocess
+import weakref
+from typing import Any, Awaitable, Dict, List, Optional, Sequence
+from .shell import print_cmd, parse_git_describe
+from .tracing import span
+from .runner import get_runner, is_real_runner
+from .describe_cache import describe_cache, cache_entry
+
+DEFAULT_CONCURRENCY_LIMIT = 4
+
+_concurrency_limit = DEFAULT_CONCURRENCY_LIMIT
+_semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = \
+    weakref.WeakKeyDictionary()
+
+
+def set_concurrency_limit(limit: int) -> None:
+    """Maximum number of commands running at the same time (per event loop)"""
+    global _concurrency_limit
+    _concurrency_limit = limit
+    _semaphores.clear()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_concurrency_limit)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+def _run_with_runner(cmd: Sequence[str], env: Optional[Dict[str, str]],
+                     cwd: Optional[str], capture: bool) -> subprocess.CompletedProcess:
+    runner = get_runner()
+    if not capture:
+        return runner.run(cmd, env, False, cwd)
+    try:
+        return subprocess.CompletedProcess(cmd, 0, runner.check_output(cmd, env, cwd))
+    except subprocess.CalledProcessError as e:
+        return subprocess.CompletedProcess(cmd, e.returncode, e.output)
+
+
+async def _exec(cmd: Sequence[str], env: Optional[Dict[str, str]],
+                cwd: Optional[str], timeout: Optional[float],
+                capture: bool) -> subprocess.CompletedProcess:
+    if not is_real_runner():
+        # recorded or replayed commands go through the synchronous runner
+        async with _semaphore():
+            print_cmd(cmd)
+            with span('async_shell', tid=id(asyncio.current_task()),
+                      cat='shell', argv=list(cmd)) as s:
+                loop = asyncio.get_running_loop()
+                result = await asyncio.wait_for(loop.run_in_executor(
+                    None, _run_with_runner, cmd, env, cwd, capture), timeout)
+                s.set(exit_code=result.returncode)
+        return result
+
+    async with _semaphore():
+        print_cmd(cmd)
+        # concurrent spans are displayed on separate rows
+        with span('async_shell', tid=id(asyncio.current_task()),
+                  cat='shell', argv=list(cmd)) as s:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, env=env, cwd=cwd,
+                stdout=subprocess.PIPE if capture else None)
+            try:
+                stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise subprocess.TimeoutExpired(cmd, timeout) from None
+            except BaseException:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+            s.set(exit_code=process.returncode)
+    output = None if stdout is None else stdout.decode()
+    return subprocess.CompletedProcess(cmd, process.returncode, output)
+
+
+async def async_shell_cmd(cmd: Sequence[str], env: Optional[Dict[str, str]] = None,
+                          cwd: Optional[str] = None,
+                          timeout: Optional[float] = None) -> str:
+    result = await _exec(cmd, env, cwd, timeout, True)
+    result.check_returncode()
+    return result.stdout
+
+
+async def async_shell_run(cmd: Sequence[str], env: Optional[Dict[str, str]] = None,
+                          check: bool = True, cwd: Optional[str] = None,
+                          timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+    result = await _exec(cmd, env, cwd, timeout, False)
+    if check:
+        result.check_returncode()
+    return result
+
+
+async def gather(*aws: Optional[Awaitable[Any]], ordered_errors: bool = False) -> List[Any]:
+    """
+    asyncio.gather() where None is kept as is.
+    With ordered_errors, all awaitables terminate and the exception of
+    the first failing one (in argument order) is raised.
+    """
+    async def none() -> None:
+        return None
+    results = await asyncio.gather(*(none() if aw is None else aw for aw in aws),
+                                   return_exceptions=ordered_errors)
+    if ordered_errors:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+    return list(results)
+
+
+def run_concurrently(*aws: Optional[Awaitable[Any]], ordered_errors: bool = False) -> List[Any]:
+    """Run awaitables from synchronous code and return their results in order"""
+    return asyncio.run(gather(*aws, ordered_errors=ordered_errors))
+
+
+async def async_git_uncommited_changes(cwd: Optional[str] = None) -> str:
+    return await async_shell_cmd(['git', 'diff', '--shortstat'], cwd=cwd)
+
+
+async def async_git_last_tag(cwd: Optional[str] = None, persistent_cache: bool = False) -> str:
+    """See git_describe_tags()"""
+    entry = cache_entry(cwd)
+    output = None if entry is None else describe_cache.get(*entry, persistent_cache)
+    if output is None:
+        output = await async_shell_cmd(['git', 'describe', '--tags'], cwd=cwd)
+        if entry is not None:
+            describe_cache.set(*entry, output, persistent_cache)
+    return parse_git_describe(output)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Manifest of generated files for incremental builds
+##
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Mapping, NamedTuple, Optional
+from .io import writeall_atomic
+from .template import Template
+
+BUILD_MANIFEST_FORMAT = 1
+
+
+def default_manifest_path(output_build: str) -> str:
+    output_build = os.path.normpath(output_build)
+    return os.path.join(os.path.dirname(output_build),
+                        f'.{os.path.basename(output_build)}.packager-manifest')
+
+
+def config_digest(template: Optional[Template], config: Mapping[str, str]) -> str:
+    """Hash of the variables used by template"""
+    variables = () if template is None else sorted(set(template.variables))
+    values = [(var, config.get(var, '')) for var in variables]
+    return hashlib.sha1(json.dumps(values).encode()).hexdigest()
+
+
+class ManifestEntry(NamedTuple):
+    template_digest: str
+    config_digest: str
+    output_digest: str
+    size: int
+    mtime_ns: int
+
+
+class BuildManifest:
+    """
+    (template hash, effective config hash, output hash) of each file
+    of an output directory.
+    """
+
+    def __init__(self, manifest_file: str, output_build: str):
+        self.manifest_file = manifest_file
+        self.output_build = output_build
+        self._entries: Dict[str, ManifestEntry] = {}
+        self._produced: Dict[str, None] = {}
+        self._modified = False
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.manifest_file, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) or data.get('format') != BUILD_MANIFEST_FORMAT:
+            return
+
+        for dest_filename, entry in data.get('files', {}).items():
+            try:
+                self._entries[dest_filename] = ManifestEntry(*entry)
+            except TypeError:
+                pass
+
+    def _is_unchanged_on_disk(self, dest_filename: str, entry: ManifestEntry) -> bool:
+        try:
+            st = os.stat(os.path.join(self.output_build, dest_filename))
+        except OSError:
+            return False
+        return st.st_size == entry.size and st.st_mtime_ns == entry.mtime_ns
+
+    def is_up_to_date(self, dest_filename: str,
+                      template_digest: str, config_digest: str) -> bool:
+        """Mark dest_filename as produced and check that its inputs are unchanged"""
+        self._produced[dest_filename] = None
+        entry = self._entries.get(dest_filename)
+        return (entry is not None
+                and entry.template_digest == template_digest
+                and entry.config_digest == config_digest
+                and self._is_unchanged_on_disk(dest_filename, entry))
+
+    def is_same_output(self, dest_filename: str, output_digest: str) -> bool:
+        entry = self._entries.get(dest_filename)
+        return (entry is not None
+                and entry.output_digest == output_digest
+                and self._is_unchanged_on_disk(dest_filename, entry))
+
+    def update(self, dest_filename: str,
+               template_digest: str, config_digest: str, output_digest: str) -> None:
+        st = os.stat(os.path.join(self.output_build, dest_filename))
+        self._entries[dest_filename] = ManifestEntry(
+            template_digest=template_digest,
+            config_digest=config_digest,
+            output_digest=output_digest,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+        )
+        self._modified = True
+
+    def remove_stale_files(self) -> List[str]:
+        """Remove files of a previous build which are no longer produced"""
+        removed = []
+        for dest_filename in list(self._entries):
+            if dest_filename not in self._produced:
+                del self._entries[dest_filename]
+                self._modified = True
+                try:
+                    os.remove(os.path.join(self.output_build, dest_filename))
+                    removed.append(dest_filename)
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def save(self) -> None:
+        if not self._modified:
+            return
+
+        data = {
+            'format': BUILD_MANIFEST_FORMAT,
+            'files': {k: list(entry) for k, entry in self._entries.items()},
+        }
+        writeall_atomic(self.manifest_file, json.dumps(data))
+        self._modified = False
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Target config files loader with include graph
+##
+
+import os
+import re
+import operator
+from typing import Dict, Iterable, List, Tuple, Optional, NamedTuple, TextIO
+from .error import PackagerError
+from .template import var_ident
+
+rgx_config_line = re.compile(rf'^({var_ident})\s*=(.*)')
+
+# (key, value) or (None, included path)
+ConfigStatement = Tuple[Optional[str], str]
+# (key, value, path of the file that defines the key)
+ConfigEntry = Tuple[str, str, str]
+
+
+class ParsedConfigFile(NamedTuple):
+    size: int
+    mtime_ns: int
+    statements: Tuple[ConfigStatement, ...]
+    includes: Tuple[str, ...]
+
+
+def parse_config_lines(path: str, lines) -> Tuple[Tuple[ConfigStatement, ...], Tuple[str, ...]]:
+    directory = os.path.dirname(path)
+    statements = []
+    includes = []
+    for line in lines:
+        if line.startswith('include '):
+            included_path = os.path.abspath(os.path.join(directory, line[8:].strip()))
+            statements.append((None, included_path))
+            includes.append(included_path)
+        else:
+            m = rgx_config_line.match(line)
+            if m is not None:
+                statements.append((m.group(1).strip(), m.group(2).strip()))
+    return tuple(statements), tuple(includes)
+
+
+class _FlattenedConfigFile(NamedTuple):
+    parsed: ParsedConfigFile
+    # entries of each included file
+    children: Tuple[Tuple[ConfigEntry, ...], ...]
+    entries: Tuple[ConfigEntry, ...]
+
+
+class ConfigLoader:
+    """
+    Parse config files and their includes.
+
+    Each file is parsed once and kept while its size and mtime are unchanged.
+    The flattened entries of a file are reused while the file and the
+    entries of its included files are unchanged.
+    """
+
+    def __init__(self, encoding: str = 'utf-8'):
+        self.encoding = encoding
+        self._files: Dict[str, ParsedConfigFile] = {}
+        self._flattened: Dict[str, _FlattenedConfigFile] = {}
+
+    def include_graph(self) -> Dict[str, Tuple[str, ...]]:
+        """path -> included paths of files loaded so far"""
+        return {path: parsed.includes for path, parsed in self._files.items()}
+
+    def _parse(self, path: str) -> ParsedConfigFile:
+        """Parsed file, read again when its size or mtime changed"""
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise PackagerError(f'Cannot read config file: {path}: {e.strerror}') from e
+
+        parsed = self._files.get(path)
+        if parsed is not None and parsed.size == st.st_size and parsed.mtime_ns == st.st_mtime_ns:
+            return parsed
+
+        with open(path, encoding=self.encoding) as f:
+            statements, includes = parse_config_lines(path, f)
+        parsed = ParsedConfigFile(st.st_size, st.st_mtime_ns, statements, includes)
+        self._files[path] = parsed
+        return parsed
+
+    def _flatten(self, path: str, stack: List[str],
+                 visited: Dict[str, Tuple[ConfigEntry, ...]]) -> Tuple[ConfigEntry, ...]:
+        """
+        visited holds the entries of files already flattened by the current
+        pass: a file included several times (diamond) is checked once.
+        """
+        entries = visited.get(path)
+        if entries is not None:
+            return entries
+
+        if path in stack:
+            cycle = ' -> '.join(stack[stack.index(path):] + [path])
+            raise PackagerError(f'Include cycle in config files: {cycle}')
+
+        parsed = self._parse(path)
+
+        stack.append(path)
+        children = tuple(self._flatten(included_path, stack, visited)
+                         for included_path in parsed.includes)
+        stack.pop()
+
+        # the cache is valid when built from the same parsed file and from
+        # the current entries of each included file
+        flattened = self._flattened.get(path)
+        if flattened is not None and flattened.parsed is parsed \
+                and all(map(operator.is_, flattened.children, children)):
+            visited[path] = flattened.entries
+            return flattened.entries
+
+        included = dict(zip(parsed.includes, children))
+        new_entries: List[ConfigEntry] = []
+        for key, value in parsed.statements:
+            if key is None:
+                new_entries.extend(included[value])
+            else:
+                new_entries.append((key, value, path))
+        entries = tuple(new_entries)
+        self._flattened[path] = _FlattenedConfigFile(parsed, children, entries)
+        visited[path] = entries
+        return entries
+
+    def entries(self, path: str) -> Tuple[ConfigEntry, ...]:
+        return self._flatten(os.path.abspath(path), [], {})
+
+    def load(self, path: str,
+             config: Optional[Dict[str, str]] = None,
+             origins: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Update config with the variables of path.
+        When origins is set, it receives the file that defines each variable.
+        """
+        return _update_config(self.entries(path), config, origins)
+
+    def load_stream(self, stream: TextIO,
+                    config: Optional[Dict[str, str]] = None,
+                    origins: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        Same as load() for a stream that is not a regular file (stdin, pipe).
+        The stream is not cached, included files are relative to the
+        current directory.
+        """
+        name = getattr(stream, 'name', '<stream>')
+        statements, _ = parse_config_lines('', stream)
+        entries: List[ConfigEntry] = []
+        visited: Dict[str, Tuple[ConfigEntry, ...]] = {}
+        for key, value in statements:
+            if key is None:
+                entries.extend(self._flatten(value, [], visited))
+            else:
+                entries.append((key, value, name))
+        return _update_config(entries, config, origins)
+
+
+def _update_config(entries: Iterable[ConfigEntry],
+                   config: Optional[Dict[str, str]],
+                   origins: Optional[Dict[str, str]]) -> Dict[str, str]:
+    config = {} if config is None else config
+    for key, value, origin in entries:
+        config[key] = value
+        if origins is not None:
+            origins[key] = origin
+    return config
+
+
+default_config_loader = ConfigLoader()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: `git describe --tags` results cached by HEAD and tags state
+##
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Tuple, NamedTuple, Optional
+from .io import writeall_atomic
+from .runner import is_real_runner
+
+DESCRIBE_CACHE_FILENAME = 'packager-describe-cache.json'
+DESCRIBE_CACHE_FORMAT = 1
+# maximum number of entries in the cache file
+DESCRIBE_CACHE_SIZE = 64
+
+
+class GitDir(NamedTuple):
+    """Paths of a repository (.git directory or worktree)"""
+    gitdir: str
+    # shared refs and objects
+    commondir: str
+
+
+def find_git_dir(cwd: Optional[str] = None) -> Optional[GitDir]:
+    path = os.path.abspath(cwd or '.')
+    while True:
+        dotgit = os.path.join(path, '.git')
+        if os.path.isdir(dotgit):
+            gitdir = dotgit
+            break
+        if os.path.isfile(dotgit):
+            # worktree or submodule: 'gitdir: PATH'
+            with open(dotgit, encoding='utf-8') as f:
+                content = f.read().strip()
+            if not content.startswith('gitdir: '):
+                return None
+            gitdir = os.path.join(path, content[8:])
+            break
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+    commondir = gitdir
+    try:
+        with open(os.path.join(gitdir, 'commondir'), encoding='utf-8') as f:
+            commondir = os.path.join(gitdir, f.read().strip())
+    except FileNotFoundError:
+        pass
+    return GitDir(os.path.normpath(gitdir), os.path.normpath(commondir))
+
+
+def _read_packed_ref(commondir: str, ref: str) -> Optional[str]:
+    try:
+        with open(os.path.join(commondir, 'packed-refs'), encoding='utf-8') as f:
+            for line in f:
+                sha, _, name = line.rstrip('\n').partition(' ')
+                if name == ref:
+                    return sha
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def read_head_sha(gitdir: GitDir) -> Optional[str]:
+    """Commit of HEAD without running git, None for an unborn branch"""
+    with open(os.path.join(gitdir.gitdir, 'HEAD'), encoding='utf-8') as f:
+        head = f.read().strip()
+    if not head.startswith('ref: '):
+        return head
+    ref = head[5:]
+    try:
+        with open(os.path.join(gitdir.commondir, ref), encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return _read_packed_ref(gitdir.commondir, ref)
+
+
+def tags_state(gitdir: GitDir) -> List[Tuple[str, int, int]]:
+    """
+    (path, mtime_ns, size) of packed-refs and of refs/tags directories.
+    A new, removed or moved tag changes the mtime of its directory.
+    """
+    state = []
+    packed_refs = os.path.join(gitdir.commondir, 'packed-refs')
+    try:
+        st = os.stat(packed_refs)
+        state.append(('packed-refs', st.st_mtime_ns, st.st_size))
+    except FileNotFoundError:
+        pass
+
+    root = os.path.join(gitdir.commondir, 'refs', 'tags')
+    dirs = [root]
+    while dirs:
+        path = dirs.pop()
+        try:
+            st = os.stat(path)
+            with os.scandir(path) as it:
+                dirs.extend(entry.path for entry in it if entry.is_dir(follow_symlinks=False))
+        except FileNotFoundError:
+            continue
+        state.append((os.path.relpath(path, gitdir.commondir), st.st_mtime_ns, 0))
+    state.sort()
+    return state
+
+
+class DescribeCache:
+    """
+    Output of `git describe --tags` indexed by HEAD commit and tags state.
+    With persistent, entries are also saved into .git/ for other processes.
+    """
+
+    def __init__(self) -> None:
+        self._memory: Dict[Tuple[str, str], str] = {}
+
+    @staticmethod
+    def key(gitdir: GitDir) -> Optional[str]:
+        head = read_head_sha(gitdir)
+        if not head:
+            return None
+        state = json.dumps([head, tags_state(gitdir)])
+        return hashlib.sha1(state.encode()).hexdigest()
+
+    @staticmethod
+    def _cache_file(gitdir: GitDir) -> str:
+        return os.path.join(gitdir.gitdir, DESCRIBE_CACHE_FILENAME)
+
+    @staticmethod
+    def _read_cache_file(gitdir: GitDir) -> Dict[str, str]:
+        try:
+            with open(DescribeCache._cache_file(gitdir), encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == DESCRIBE_CACHE_FORMAT:
+                return dict(data['entries'])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        return {}
+
+    def get(self, gitdir: GitDir, key: str, persistent: bool = False) -> Optional[str]:
+        output = self._memory.get((gitdir.gitdir, key))
+        if output is None and persistent:
+            output = self._read_cache_file(gitdir).get(key)
+            if output is not None:
+                self._memory[(gitdir.gitdir, key)] = output
+        return output
+
+    def set(self, gitdir: GitDir, key: str, output: str, persistent: bool = False) -> None:
+        self._memory[(gitdir.gitdir, key)] = output
+        if persistent:
+            entries = self._read_cache_file(gitdir)
+            entries.pop(key, None)
+            entries[key] = output
+            # keep the most recent entries
+            entries = dict(list(entries.items())[-DESCRIBE_CACHE_SIZE:])
+            try:
+                writeall_atomic(self._cache_file(gitdir), json.dumps({
+                    'format': DESCRIBE_CACHE_FORMAT,
+                    'entries': entries,
+                }))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+
+describe_cache = DescribeCache()
+
+
+def cache_entry(cwd: Optional[str] = None) -> Optional[Tuple[GitDir, str]]:
+    """
+    Repository and key of the current state.
+    None when the cache cannot be used (no repository, unborn branch,
+    commands recorded or replayed).
+    """
+    if not is_real_runner():
+        return None
+    try:
+        gitdir = find_git_dir(cwd)
+        if gitdir is None:
+            return None
+        key = DescribeCache.key(gitdir)
+    except OSError:
+        return None
+    return None if key is None else (gitdir, key)
@@ -1,3 +1,6 @@
+import re
+
+
 class DistroInfo:
     _id = ''
     _name = ''
@@ -12,6 +12,10 @@ import traceback
 from typing import Union
 
 
+class PackagerError(Exception):
+    pass
+
+
 def print_error(s: Union[str, Exception], file=sys.stderr) -> None:
     parts = str(s).split('\n')
     line_size = max(map(len, parts))
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Read-only git queries through long-lived git processes
+##
+
+import subprocess
+from typing import Dict, List, Tuple, Optional, NamedTuple, IO
+from .shell import print_cmd, shell_lines
+
+
+class ObjectInfo(NamedTuple):
+    sha: str
+    type: str
+    size: int
+
+
+class GitSession:
+    """
+    Answer read-only queries with one `git cat-file --batch-check`,
+    one `git cat-file --batch` and one `git for-each-ref` per session
+    instead of a git process per query.
+
+    References are read once, call refresh_refs() after a command that
+    modifies them.
+    """
+
+    def __init__(self, cwd: Optional[str] = None):
+        self.cwd = cwd
+        self._batch_check: Optional[subprocess.Popen] = None
+        self._batch: Optional[subprocess.Popen] = None
+        self._refs: Optional[Dict[str, str]] = None
+        self._head_branch: Optional[str] = None
+
+    def __enter__(self) -> 'GitSession':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _start(self, option: str) -> subprocess.Popen:
+        cmd = ('git', 'cat-file', option)
+        print_cmd(cmd)
+        return subprocess.Popen(cmd, cwd=self.cwd,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def close(self) -> None:
+        for process in (self._batch_check, self._batch):
+            if process is not None:
+                process.stdin.close()
+                process.stdout.close()
+                process.wait()
+        self._batch_check = None
+        self._batch = None
+
+    @staticmethod
+    def _request(process: subprocess.Popen, rev: str) -> Optional[ObjectInfo]:
+        if '\n' in rev:
+            raise ValueError(f'Invalid revision: {rev!r}')
+        stdin: IO[bytes] = process.stdin
+        stdin.write(f'{rev}\n'.encode())
+        stdin.flush()
+        header = process.stdout.readline().decode()
+        if not header:
+            raise OSError('git cat-file process terminated')
+        # '<sha> <type> <size>' or '<rev> missing' / '<rev> ambiguous'
+        parts = header.split()
+        if len(parts) != 3 or parts[1] in ('missing', 'ambiguous'):
+            return None
+        return ObjectInfo(parts[0], parts[1], int(parts[2]))
+
+    def object_info(self, rev: str) -> Optional[ObjectInfo]:
+        if self._batch_check is None:
+            self._batch_check = self._start('--batch-check')
+        return self._request(self._batch_check, rev)
+
+    def object_exists(self, rev: str) -> bool:
+        return self.object_info(rev) is not None
+
+    def resolve(self, rev: str) -> Optional[str]:
+        info = self.object_info(rev)
+        return None if info is None else info.sha
+
+    def read_object(self, rev: str) -> Optional[Tuple[ObjectInfo, bytes]]:
+        if self._batch is None:
+            self._batch = self._start('--batch')
+        info = self._request(self._batch, rev)
+        if info is None:
+            return None
+        # content followed by a newline
+        content = self._batch.stdout.read(info.size + 1)[:-1]
+        return info, content
+
+    def read_blob(self, rev: str) -> Optional[bytes]:
+        result = self.read_object(rev)
+        if result is None or result[0].type != 'blob':
+            return None
+        return result[1]
+
+    def _load_refs(self) -> Dict[str, str]:
+        if self._refs is None:
+            refs = {}
+            self._head_branch = None
+            for line in shell_lines(['git', 'for-each-ref',
+                                     '--format=%(HEAD) %(objectname) %(refname)'],
+                                    cwd=self.cwd):
+                if not line:
+                    continue
+                # '*' or ' ' for %(HEAD)
+                sha, ref = line[2:].split(' ', 1)
+                refs[ref] = sha
+                if line[0] == '*':
+                    self._head_branch = ref
+            self._refs = refs
+        return self._refs
+
+    def refresh_refs(self) -> None:
+        self._refs = None
+
+    def refs(self, prefix: str = '') -> Dict[str, str]:
+        return {ref: sha for ref, sha in self._load_refs().items() if ref.startswith(prefix)}
+
+    def tags(self) -> List[str]:
+        prefix = 'refs/tags/'
+        return [ref[len(prefix):] for ref in self._load_refs() if ref.startswith(prefix)]
+
+    def tag_exists(self, tag: str) -> bool:
+        return f'refs/tags/{tag}' in self._load_refs()
+
+    def current_branch(self) -> Optional[str]:
+        """None with a detached HEAD"""
+        self._load_refs()
+        prefix = 'refs/heads/'
+        branch = self._head_branch
+        return None if branch is None else branch[len(prefix):]
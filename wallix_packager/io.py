@@ -7,6 +7,11 @@
 # Author(s): Jonathan Poelen
 ##
 
+import os
+import tempfile
+from typing import Optional, Union
+
+
 def readall(filename: str, encoding: str = 'utf-8') -> str:
     with open(filename, encoding=encoding) as f:
         return f.read()
@@ -15,3 +20,119 @@ def readall(filename: str, encoding: str = 'utf-8') -> str:
 def writeall(filename: str, s: str, encoding: str = 'utf-8') -> None:
     with open(filename, 'w+', encoding=encoding) as f:
         f.write(s)
+
+
+def writeall_atomic(filename: str, s: Union[str, bytes], encoding: str = 'utf-8',
+                    mode: Optional[int] = None) -> None:
+    """
+    Write into a temporary file of the same directory, then rename it.
+    mode sets the permission bits (0o600 by default).
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename) or '.',
+                               prefix=f'.{os.path.basename(filename)}.')
+    try:
+        if mode is not None:
+            os.fchmod(fd, mode)
+        if isinstance(s, bytes):
+            with open(fd, 'wb') as f:
+                f.write(s)
+        else:
+            with open(fd, 'w', encoding=encoding) as f:
+                f.write(s)
+        os.replace(tmp, filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+COPY_MODES = ('copy', 'reflink', 'hardlink')
+
+# linux/fs.h
+_FICLONE = 0x40049409
+
+
+def _copy_file_content(src_fd: int, dst_fd: int, size: int,
+                       chunk_size: int = 1 << 24) -> None:
+    """Copy size bytes from the current offset of src_fd to the current offset of dst_fd"""
+    if hasattr(os, 'copy_file_range'):
+        src_pos = os.lseek(src_fd, 0, os.SEEK_CUR)
+        dst_pos = os.lseek(dst_fd, 0, os.SEEK_CUR)
+        remaining = size
+        try:
+            while remaining > 0:
+                n = os.copy_file_range(src_fd, dst_fd, min(remaining, chunk_size))
+                if n == 0:
+                    break
+                remaining -= n
+            return
+        except OSError:
+            # cross-device or unsupported filesystem
+            os.lseek(src_fd, src_pos, os.SEEK_SET)
+            os.lseek(dst_fd, dst_pos, os.SEEK_SET)
+            os.ftruncate(dst_fd, dst_pos)
+
+    offset = os.lseek(src_fd, 0, os.SEEK_CUR)
+    end = offset + size
+    while offset < end:
+        n = os.sendfile(dst_fd, src_fd, offset, min(end - offset, chunk_size))
+        if n == 0:
+            break
+        offset += n
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def copy_file(src: str, dst: str, mode: str = 'copy') -> None:
+    """
+    Copy src to dst without going through Python buffers.
+    mode is one of COPY_MODES, reflink and hardlink fall back to a copy
+    when the filesystem does not support them.
+    The permission bits of src are preserved.
+    """
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+
+    if mode == 'hardlink':
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+    with open(src, 'rb') as fsrc:
+        st = os.fstat(fsrc.fileno())
+        with open(dst, 'wb') as fdst:
+            if mode != 'reflink' or not _reflink(fsrc.fileno(), fdst.fileno()):
+                _copy_file_content(fsrc.fileno(), fdst.fileno(), st.st_size)
+            os.chmod(fdst.fileno(), st.st_mode & 0o7777)
+
+
+def prependall(filename: str, s: str, encoding: str = 'utf-8') -> None:
+    """
+    Insert s at the beginning of filename.
+    The old content is copied by chunks into a temporary file which
+    replaces filename, memory usage does not depend on the file size.
+    """
+    with open(filename, 'rb') as fsrc:
+        st = os.fstat(fsrc.fileno())
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename) or '.',
+                                   prefix=f'.{os.path.basename(filename)}.')
+        try:
+            with open(fd, 'wb') as fdst:
+                fdst.write(s.encode(encoding))
+                fdst.flush()
+                _copy_file_content(fsrc.fileno(), fdst.fileno(), st.st_size)
+                os.chmod(fdst.fileno(), st.st_mode & 0o7777)
+            os.replace(tmp, filename)
+        except BaseException:
+            os.unlink(tmp)
+            raise
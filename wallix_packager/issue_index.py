@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Persistent index of issue ids referenced by commits
+##
+
+import re
+import json
+from typing import Dict, List, Tuple, Iterable, Optional
+from .io import writeall_atomic
+from .shell import shell_lines
+
+rgx_issue = re.compile(r'((?:\bWAB-|#)\d+)')
+
+ISSUE_INDEX_FORMAT = 1
+
+# number of commits per `git log --no-walk` command
+_LOG_CHUNK_SIZE = 2048
+
+
+def extract_issues(subject: str) -> Tuple[str, ...]:
+    return tuple(rgx_issue.findall(subject))
+
+
+class IssueIndex:
+    """
+    Issue ids (WAB-NNN, #NNN) of commit subjects indexed by commit sha.
+
+    A range query lists its commits with `git rev-list` and only the
+    subjects of commits not yet indexed are read and scanned.
+    With cache_file, the index is loaded from and saved to disk.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, cwd: Optional[str] = None):
+        self.cache_file = cache_file
+        self.cwd = cwd
+        self._commits: Dict[str, Tuple[str, ...]] = {}
+        self._modified = False
+        if cache_file:
+            self._load_cache_file(cache_file)
+
+    def _load_cache_file(self, cache_file: str) -> None:
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) or data.get('format') != ISSUE_INDEX_FORMAT:
+            return
+
+        commits = data.get('commits')
+        if isinstance(commits, dict):
+            self._commits = {sha: tuple(issues) for sha, issues in commits.items()}
+
+    def __len__(self) -> int:
+        return len(self._commits)
+
+    def __contains__(self, sha: object) -> bool:
+        return sha in self._commits
+
+    def _index(self, shas: List[str]) -> None:
+        for i in range(0, len(shas), _LOG_CHUNK_SIZE):
+            cmd = ['git', 'log', '--no-walk=unsorted', '--pretty=tformat:%H %s',
+                   *shas[i:i + _LOG_CHUNK_SIZE]]
+            for line in shell_lines(cmd, cwd=self.cwd):
+                sha, _, subject = line.partition(' ')
+                self._commits[sha] = extract_issues(subject)
+        self._modified = True
+
+    def commits(self, from_rev: str, to_rev: str = 'HEAD') -> List[str]:
+        """Commits of from_rev..to_rev, new commits are indexed"""
+        shas = list(shell_lines(['git', 'rev-list', f'{from_rev}..{to_rev}'], cwd=self.cwd))
+        missing = [sha for sha in shas if sha not in self._commits]
+        if missing:
+            self._index(missing)
+        return shas
+
+    def issues_between(self, from_rev: str, to_rev: str = 'HEAD') -> List[str]:
+        """Sorted issue ids of from_rev..to_rev"""
+        return self.issues_of(self.commits(from_rev, to_rev))
+
+    def issues_of(self, shas: Iterable[str]) -> List[str]:
+        """Sorted issue ids of indexed commits"""
+        issues = set()
+        for sha in shas:
+            issues.update(self._commits[sha])
+        return sorted(issues)
+
+    def save(self) -> None:
+        if not self.cache_file or not self._modified:
+            return
+
+        writeall_atomic(self.cache_file, json.dumps({
+            'format': ISSUE_INDEX_FORMAT,
+            'commits': self._commits,
+        }))
+        self._modified = False
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Config with lazy values and %VAR% references
+##
+
+import threading
+from typing import (Dict, List, Tuple, Union, Callable,
+                    Iterator, Optional, MutableMapping)
+from .error import PackagerError
+from .template import compile_template
+
+LazyValue = Callable[['LazyConfig'], str]
+RawValue = Union[str, LazyValue]
+
+
+class LazyConfig(MutableMapping[str, str]):
+    """
+    Mapping whose values are resolved on first access.
+
+    A string value may reference other variables with %VAR% (an unknown
+    variable is replaced by an empty string). A callable value receives
+    the config and its result is used as is.
+    Resolved values are memoized until the config is modified.
+    """
+
+    def __init__(self, values: Optional[Dict[str, RawValue]] = None):
+        self._raw: Dict[str, RawValue] = dict(values or ())
+        self._resolved: Dict[str, str] = {}
+        self._dependencies: Dict[str, Tuple[str, ...]] = {}
+        self._resolving: List[str] = []
+        self._lock = threading.RLock()
+
+    def _resolve(self, key: str) -> str:
+        value = self._resolved.get(key)
+        if value is not None:
+            return value
+
+        if key in self._resolving:
+            cycle = ' -> '.join(self._resolving[self._resolving.index(key):] + [key])
+            raise PackagerError(f'Variable cycle: {cycle}')
+
+        raw = self._raw[key]
+        self._resolving.append(key)
+        try:
+            if isinstance(raw, str):
+                template = compile_template(raw)
+                self._dependencies[key] = template.variables
+                value = template.render(self) if template.variables else raw
+            elif callable(raw):
+                value = raw(self)
+            else:
+                value = raw
+        finally:
+            self._resolving.pop()
+
+        self._resolved[key] = value
+        return value
+
+    def __getitem__(self, key: str) -> str:
+        with self._lock:
+            return self._resolve(key)
+
+    def __setitem__(self, key: str, value: RawValue) -> None:
+        with self._lock:
+            self._raw[key] = value
+            self._resolved.clear()
+            self._dependencies.clear()
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            del self._raw[key]
+            self._resolved.clear()
+            self._dependencies.clear()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._raw
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def raw(self, key: str) -> Optional[RawValue]:
+        """Value before resolution"""
+        return self._raw.get(key)
+
+    def is_resolved(self, key: str) -> bool:
+        return key in self._resolved
+
+    def copy(self) -> 'LazyConfig':
+        return LazyConfig(self._raw)
+
+    def dependency_graph(self) -> Dict[str, Tuple[str, ...]]:
+        """Variables referenced by each resolved string value"""
+        with self._lock:
+            return dict(self._dependencies)
@@ -10,18 +10,31 @@
 
 import os
 import re
+import glob
+import time
 import shutil
+import hashlib
 import argparse
+import functools
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import (Dict, Tuple, List, Iterable,
                     NamedTuple, Optional, TextIO, Callable)
-from .io import writeall, readall
-from .version import less_version
-from .shell import git_uncommited_changes, git_last_tag, shell_run
+from .error import PackagerError
+from .io import writeall, readall, prependall, copy_file, COPY_MODES
+from .version import less_version, version_key, regex_version_or_die
+from .shell import shell_run
+from .tag import git_push_version
+from .async_shell import run_concurrently, async_git_uncommited_changes, async_git_last_tag
 from .synchronizer import chdir
-from .repo_updater import run_update_repo
-
-var_ident = '[A-Z][A-Z0-9_]*'
+from .repo_updater import run_update_repo, run_update_repos, print_update_report
+from .template import var_ident, compile_template, TemplateCache
+from .config_loader import ConfigLoader, default_config_loader
+from .lazy_config import LazyConfig
+from .tracing import span, traced, start_tracing, stop_tracing
+from .build_manifest import BuildManifest, config_digest, default_manifest_path
+from .version_scanner import VersionRule, scan_versions, group_by_version
+from .reference_updater import update_references, print_reference_updates
 
 DEFAULT_PATTERN_VERSION = r'(?:[a-zA-Z_][a-zA-Z0-9_]*)?VERSION\b\s*(?:=\s*)?[\'"]?([^\'" ]*)'
 
@@ -42,10 +55,6 @@ def build_reference_pattern(pattern: Optional[str], application_name: Optional[s
     return re.compile(pattern)
 
 
-class PackagerError(Exception):
-    pass
-
-
 class DistributionInfos(NamedTuple):
     distribution_id: str
     distribution_name: str
@@ -53,6 +62,7 @@ class DistributionInfos(NamedTuple):
     distribution_codename: str
 
 
+@traced('distribution infos')
 def distribution_infos(load_infos: bool,
                        distribution_id: Optional[str],
                        distribution_name: Optional[str],
@@ -83,46 +93,44 @@ def distribution_infos(load_infos: bool,
 
 
 def replace_dict_all(text: str, variables: Dict[str, str]) -> str:
-    rgx_replace_var = re.compile(f'%{var_ident}%')
-    text_parts = []
-    pos = 0
-    for m in rgx_replace_var.finditer(text):
-        text_parts.append(text[pos:m.start()])
-        var = m.group()
-        text_parts.append(variables.get(var[1:-1], ''))
-        pos = m.end()
-    text_parts.append(text[pos:])
-    return ''.join(text_parts)
-
-
-def _read_config(config_file: TextIO,
-                 encoding: str,
-                 config: Dict[str, str],
-                 parse_config_rgx: re.Pattern) -> None:
-    for line in config_file:
-        if line.startswith('include '):
-            directory = os.path.dirname(config_file.name)
-            included_path = os.path.join(directory, line[8:].strip())
-            with open(included_path, encoding=encoding) as f:
-                _read_config(f, encoding, config, parse_config_rgx)
-        else:
-            m = re.match(parse_config_rgx, line)
-            if m is not None:
-                config[m.group(1).strip()] = m.group(2).strip()
+    return compile_template(text).render(variables)
 
 
 def read_config(config_file: TextIO,
                 config: Optional[Dict[str, str]] = None,
-                encoding: str = 'utf-8') -> Dict[str, str]:
+                encoding: str = 'utf-8',
+                origins: Optional[Dict[str, str]] = None,
+                loader: Optional[ConfigLoader] = None) -> Dict[str, str]:
     """ Parse target Config files """
-    parse_config_rgx = re.compile(rf'^({var_ident})\s*=(.*)')
-    config = {} if config is None else config
+    if loader is None:
+        loader = default_config_loader if encoding == 'utf-8' else ConfigLoader(encoding)
+    name = getattr(config_file, 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return loader.load(name, config, origins)
+    # stdin, pipe
+    return loader.load_stream(config_file, config, origins)
 
-    _read_config(config_file, encoding, config, parse_config_rgx)
-    return config
+
+def _normalize_lazy_config(config: LazyConfig) -> None:
+    # DIST_ID is only resolved when PKG_DISTRIBUTION is used
+    # or when TARGET_NAME is not defined
+    if 'DIST_ID' not in config:
+        return
+
+    if config.raw('PKG_DISTRIBUTION') is None:
+        config['PKG_DISTRIBUTION'] = lambda config: ('unstable' if config['DIST_ID'] == 'ubuntu'
+                                                     else config['DIST_ID'])
+
+    # TARGET_NAME stays unset for other distributions
+    if config.raw('TARGET_NAME') is None and config['DIST_ID'] == 'ubuntu':
+        config['TARGET_NAME'] = '+ubuntu'
 
 
 def normalize_config(config: Dict[str, str]) -> None:
+    if isinstance(config, LazyConfig):
+        _normalize_lazy_config(config)
+        return
+
     if config.get('PKG_DISTRIBUTION') is None:
         dist_id = config.get('DIST_ID')
         if dist_id == 'ubuntu':
@@ -151,8 +159,13 @@ def update_config_variables(config: Dict[str, str], variables: Iterable[str]) ->
     return variable_errors
 
 
-def print_config(config: Dict[str, str]) -> None:
-    print('\n'.join(f'{k} = {v}' for k, v in config.items()))
+def print_config(config: Dict[str, str],
+                 origins: Optional[Dict[str, str]] = None) -> None:
+    if origins is None:
+        print('\n'.join(f'{k} = {v}' for k, v in config.items()))
+    else:
+        print('\n'.join(f'{k} = {v}  # {origins[k]}' if k in origins else f'{k} = {v}'
+                         for k, v in config.items()))
 
 
 def get_changelog_entry(project_name: str,
@@ -187,8 +200,7 @@ def get_changelog_entry(project_name: str,
 
 
 def update_changelog(changelog_path: str, changelog: str) -> None:
-    changelog += readall(changelog_path)
-    writeall(changelog_path, changelog)
+    prependall(changelog_path, changelog)
 
 
 def prepare_build_files(
@@ -218,47 +230,140 @@ def prepare_build_files(
     return dest_filenames_config
 
 
-def create_build_directory(package_template_dir: str,
-                           output_build: str,
-                           config: Dict[str, str]) -> None:
-    try:
-        os.mkdir(output_build, 0o766)
-    except FileExistsError:
-        pass
+class BuildFile(NamedTuple):
+    template_path: str
+    dest_filename: str
+    config: Dict[str, str]
 
+
+def list_build_files(package_template_dir: str,
+                     config: Dict[str, str]) -> List[BuildFile]:
     rgx_tempfile = re.compile('^#.*#$|~$')
     filenames = filter(lambda fname: rgx_tempfile.match(fname) is None,
                        os.listdir(package_template_dir))
 
     from .pybuild import pybuild_parameters
     extra_config = pybuild_parameters(config)
-    file_dest_configs = (
-        (filename, dest_filename, dest_config)
+    return [
+        BuildFile(f'{package_template_dir}/{filename}', dest_filename, dest_config)
         for filename in filenames
         for dest_filename, dest_config in prepare_build_files(
             filename,
             extra_config,
             config
         )
-    )
-    for filename, dest_filename, dest_config in file_dest_configs:
-        out = readall(f'{package_template_dir}/{filename}')
-        out = replace_dict_all(out, dest_config)
-        writeall(f'{output_build}/{dest_filename}', out)
+    ]
 
 
-def remove_directory(directory: str) -> None:
+def collect_build_files(package_template_dirs: Iterable[str],
+                        config: Dict[str, str],
+                        jobs: int = 1) -> List[BuildFile]:
+    """
+    Files of all template directories.
+    When several directories produce the same file, the last one wins.
+    """
+    package_template_dirs = list(package_template_dirs)
+    if jobs > 1 and len(package_template_dirs) > 1:
+        with ThreadPoolExecutor(min(jobs, len(package_template_dirs))) as executor:
+            dir_build_files = list(executor.map(lambda dirname: list_build_files(dirname, config),
+                                                package_template_dirs))
+    else:
+        dir_build_files = [list_build_files(dirname, config)
+                           for dirname in package_template_dirs]
+
+    build_files: Dict[str, BuildFile] = {}
+    for files in dir_build_files:
+        for build_file in files:
+            build_files.pop(build_file.dest_filename, None)
+            build_files[build_file.dest_filename] = build_file
+    return list(build_files.values())
+
+
+def write_build_file(build_file: BuildFile,
+                     output_build: str,
+                     template_cache: TemplateCache,
+                     manifest: Optional[BuildManifest] = None,
+                     copy_mode: str = 'copy') -> None:
+    template_path, dest_filename, dest_config = build_file
+    template_digest, template = template_cache.load(template_path)
+    dest_path = f'{output_build}/{dest_filename}'
+
+    digest = ''
+    if manifest is not None:
+        digest = config_digest(template, dest_config)
+        if manifest.is_up_to_date(dest_filename, template_digest, digest):
+            return
+
+    # file without placeholder
+    if template is None:
+        if manifest is None or not manifest.is_same_output(dest_filename, template_digest):
+            copy_file(template_path, dest_path, copy_mode)
+        if manifest is not None:
+            manifest.update(dest_filename, template_digest, digest, template_digest)
+        return
+
+    out = template.render(dest_config).encode(template_cache.encoding)
+    output_digest = ''
+    if manifest is not None:
+        output_digest = hashlib.sha1(out).hexdigest()
+    if manifest is None or not manifest.is_same_output(dest_filename, output_digest):
+        # dest_path may be a hard link to a template
+        try:
+            os.unlink(dest_path)
+        except FileNotFoundError:
+            pass
+        with open(dest_path, 'wb') as f:
+            f.write(out)
+        shutil.copymode(template_path, dest_path)
+    if manifest is not None:
+        manifest.update(dest_filename, template_digest, digest, output_digest)
+
+
+def write_build_files(build_files: Iterable[BuildFile],
+                      output_build: str,
+                      template_cache: TemplateCache,
+                      manifest: Optional[BuildManifest] = None,
+                      jobs: int = 1,
+                      copy_mode: str = 'copy') -> None:
+    """
+    build_files must not contain the same destination twice
+    (see collect_build_files()) when jobs > 1.
+    """
     try:
-        shutil.rmtree(directory)
-    except OSError:
+        os.mkdir(output_build, 0o766)
+    except FileExistsError:
         pass
 
+    def write(build_file: BuildFile) -> None:
+        write_build_file(build_file, output_build, template_cache, manifest, copy_mode)
+
+    if jobs > 1:
+        with ThreadPoolExecutor(jobs) as executor:
+            # consume results to propagate exceptions
+            for _ in executor.map(write, build_files):
+                pass
+    else:
+        for build_file in build_files:
+            write(build_file)
+
+    if manifest is not None:
+        manifest.remove_stale_files()
+
 
-def regex_version_or_die(pattern: str) -> re.Pattern:
+def create_build_directory(package_template_dir: str,
+                           output_build: str,
+                           config: Dict[str, str],
+                           template_cache: Optional[TemplateCache] = None) -> None:
+    write_build_files(list_build_files(package_template_dir, config),
+                      output_build,
+                      template_cache or TemplateCache())
+
+
+def remove_directory(directory: str) -> None:
     try:
-        return re.compile(pattern)
-    except re.error as e:
-        raise PackagerError(f'Invalid error on regex version: {pattern}') from e
+        shutil.rmtree(directory)
+    except OSError:
+        pass
 
 
 class ExtractedVersion(NamedTuple):
@@ -304,11 +409,24 @@ def add_arguments_for_get_version_command(parser: argparse.ArgumentParser,
                         help='pattern for version extractor')
 
 
-def add_arguments_for_show_config_command(parser: argparse.ArgumentParser) -> None:
+def add_arguments_for_scan_versions_command(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('-r', '--rule', metavar=('GLOB', 'REGEX'), nargs=2,
+                        action='append', required=True,
+                        help='files relative to --root that match GLOB'
+                             ' and the version pattern (first group)')
+    parser.add_argument('--root', metavar='DIRNAME', default='.',
+                        help='scanned directory')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=4,
+                        help='number of files scanned in parallel')
+
+
+def add_arguments_for_show_config_command(parser: argparse.ArgumentParser,
+                                          with_target_file: bool = True) -> None:
     add_arguments_for_get_version_command(parser, required=False)
-    parser.add_argument('-t', '--target-file', metavar='NAME',
-                        type=argparse.FileType('r', encoding='utf-8'),
-                        help='target file path')
+    if with_target_file:
+        parser.add_argument('-t', '--target-file', metavar='NAME',
+                            type=argparse.FileType('r', encoding='utf-8'),
+                            help='target file path')
 
     parser.add_argument('-n', '--project-name', metavar='NAME')
     parser.add_argument('-v', '--project-version', metavar='VERSION')
@@ -333,6 +451,21 @@ def add_arguments_for_show_config_command(parser: argparse.ArgumentParser) -> No
                         help='support of VARIABLE=VALUE and VARIABLE+=VALUE')
 
 
+def add_arguments_for_rendering(group: argparse._ActionsContainer) -> None:
+    group.add_argument('-d', '--package-template-dir', metavar='DIRNAMES',
+                       nargs='+', default=['packaging/template/debian'],
+                       help='package template directory')
+    group.add_argument('--template-cache', metavar='PATH',
+                       help='file where compiled templates are kept between runs')
+    group.add_argument('-j', '--jobs', metavar='N', type=int, default=1,
+                       help='number of files rendered in parallel')
+    group.add_argument('--incremental', action='store_true',
+                       help='only rewrite files whose template or variables changed'
+                            ' (use with --no-clean)')
+    group.add_argument('--copy-mode', choices=COPY_MODES, default='copy',
+                       help='how templates without variable are copied')
+
+
 def add_arguments_for_build_command(parser: argparse.ArgumentParser) -> None:
     add_arguments_for_show_config_command(parser)
 
@@ -341,13 +474,14 @@ def add_arguments_for_build_command(parser: argparse.ArgumentParser) -> None:
                        default='debian', help='build directory')
     group.add_argument('--no-clean', action='store_true',
                        help='remove build directory after build')
-    group.add_argument('-d', '--package-template-dir', metavar='DIRNAMES',
-                       nargs='+', default=['packaging/template/debian'],
-                       help='package template directory')
     group.add_argument('-b', '--build-package', action='store_true',
                        help='run dpkg-buildpackage')
     group.add_argument('--use-pybuild', action='store_true',
                        help='This option is deprecated')
+    add_arguments_for_rendering(group)
+    group.add_argument('--build-manifest', metavar='PATH',
+                       help='manifest used by --incremental'
+                            ' (default: .DIRNAME.packager-manifest next to the build directory)')
 
     group = parser.add_argument_group('Git integration options')
     # py-3.9: action=argparse.BooleanOptionalAction
@@ -359,6 +493,21 @@ def add_arguments_for_build_command(parser: argparse.ArgumentParser) -> None:
     parser.add_argument('--no-check-version', action='store_false',
                         dest='check_version')
     parser.add_argument('--check-version', action='store_true')
+    parser.add_argument('--git-describe-cache', action='store_true',
+                        help='share the last tag of --check-version with other processes'
+                             ' through a cache file in .git/')
+
+
+def add_arguments_for_build_matrix_command(parser: argparse.ArgumentParser) -> None:
+    add_arguments_for_show_config_command(parser, with_target_file=False)
+    parser.add_argument('target_files', metavar='TARGET', nargs='+',
+                        help='target file paths or glob patterns')
+
+    group = parser.add_argument_group('Output options')
+    group.add_argument('-o', '--output-build', metavar='DIRNAME',
+                       default='build-matrix',
+                       help='directory that contains a build directory per target')
+    add_arguments_for_rendering(group)
 
 
 def add_arguments_for_sync_tag_command(parser: argparse.ArgumentParser,
@@ -370,6 +519,10 @@ def add_arguments_for_sync_tag_command(parser: argparse.ArgumentParser,
                              f' Is relative to -u/--{DEFAULT_UPDATED_REPO_NAME}-path')
     parser.add_argument('--pattern-reference', metavar='REGEX',
                         help=f'pattern for reference tag updater')
+    parser.add_argument('--reference-rule', metavar=('GLOB', 'REGEX'), nargs=2,
+                        action='append',
+                        help=f'update all files relative to -u/--{DEFAULT_UPDATED_REPO_NAME}-path'
+                             ' that match GLOB with the version pattern (first group)')
 
     parser.add_argument('-B', f'--{DEFAULT_UPDATED_REPO_NAME}-branch', metavar='BRANCH',
                         dest='updated_repo_branch', default=DEFAULT_UPDATED_REPO_BRANCH,
@@ -385,8 +538,18 @@ def add_arguments_for_sync_tag_command(parser: argparse.ArgumentParser,
     parser.add_argument('--application-name', default=DEFAULT_REPO_NAME,
                         required=DEFAULT_REPO_NAME is None)
     parser.add_argument('-u', f'--{DEFAULT_UPDATED_REPO_NAME}-path',
-                        dest='updated_repo_path',
-                        required=require_updated_repo_path)
+                        dest='updated_repo_path', action='append',
+                        required=require_updated_repo_path,
+                        help='can be repeated: repositories are then updated'
+                             ' one after the other (in parallel with -y)')
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help='update without question, several repositories are then'
+                             ' updated in parallel')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=4,
+                        help='number of repositories updated in parallel')
+    parser.add_argument('--force-version', metavar='VERSION',
+                        help='new version (default: read from --version-file,'
+                             ' incremented by create-tag)')
 
 
 def add_arguments_for_create_tag_command(parser: argparse.ArgumentParser) -> None:
@@ -400,6 +563,8 @@ def add_arguments_for_create_tag_command(parser: argparse.ArgumentParser) -> Non
                         dest='no_update_for_updated_repo')
 
     parser.add_argument('--update-changelog', action='store_true')
+    parser.add_argument('--remote', default='origin',
+                        help='remote where the branch and the tag are pushed')
 
 
 class Hook:
@@ -408,8 +573,13 @@ class Hook:
         return version
 
     def update_repo(self, version: str, project_path: str, args: argparse.Namespace) -> None:
+        if args.reference_rule:
+            self.bulk_update_repo(version, [VersionRule(glob, pattern)
+                                            for glob, pattern in args.reference_rule])
+            if not args.reference_file:
+                return
         if not args.reference_file:
-            raise PackagerError('--reference-file is missing')
+            raise PackagerError('--reference-file or --reference-rule is missing')
         self.basic_update_repo(version,
                                args.reference_file,
                                build_reference_pattern(args.pattern_reference,
@@ -429,6 +599,11 @@ class Hook:
         writeall(reference_filename,
                  f'{content[:pos[0]]}{version}{content[pos[1]:]}')
 
+    def bulk_update_repo(self, version: str, rules: Iterable[VersionRule],
+                         root: str = '.') -> None:
+        """Update references of all files matched by rules, see update_references()"""
+        print_reference_updates(update_references(root, rules, version))
+
 
 def cmd_show_version(args: argparse.Namespace, hook: Hook) -> None:
     version = read_version_from_file_or_die(args.pattern_version,
@@ -437,20 +612,42 @@ def cmd_show_version(args: argparse.Namespace, hook: Hook) -> None:
     print(version)
 
 
-def make_config(args: argparse.Namespace) -> Dict[str, str]:
-    dist_infos = distribution_infos(load_infos=args.load_distribution_infos,
-                                    distribution_id=args.distribution_id,
-                                    distribution_name=args.distribution_name,
-                                    distribution_version=args.distribution_version,
-                                    distribution_codename=args.distribution_codename)
+def cmd_scan_versions(args: argparse.Namespace, hook: Hook) -> None:
+    rules = [VersionRule(glob, pattern) for glob, pattern in args.rule]
+    results = scan_versions(args.root, rules, hook.normalize_version, args.jobs)
+    for scanned in results:
+        print(f'{scanned.filename}:{scanned.position[0]}: {scanned.version}')
 
-    config = dict(filter(
+    groups = group_by_version(results)
+    if not groups:
+        raise PackagerError('No version found')
+    if len(groups) > 1:
+        mismatches = '\n'.join(
+            f'- {version}: {", ".join(scanned.filename for scanned in scanned_list)}'
+            for version, scanned_list in groups.items())
+        raise PackagerError(f'Version mismatch:\n{mismatches}')
+
+
+def make_base_config(args: argparse.Namespace) -> LazyConfig:
+    """
+    Config without target file nor -s / --variable.
+    Distribution infos are loaded only when used.
+    """
+    @functools.lru_cache(maxsize=None)
+    def dist_infos() -> DistributionInfos:
+        return distribution_infos(load_infos=args.load_distribution_infos,
+                                  distribution_id=args.distribution_id,
+                                  distribution_name=args.distribution_name,
+                                  distribution_version=args.distribution_version,
+                                  distribution_codename=args.distribution_codename)
+
+    return LazyConfig(dict(filter(
         lambda t: t[1] is not None,
         (
-            ('DIST_ID', dist_infos.distribution_id),
-            ('DIST_NAME', dist_infos.distribution_name),
-            ('DIST_VERSION', dist_infos.distribution_version),
-            ('DIST_CODENAME', dist_infos.distribution_codename),
+            ('DIST_ID', lambda config: dist_infos().distribution_id),
+            ('DIST_NAME', lambda config: dist_infos().distribution_name),
+            ('DIST_VERSION', lambda config: dist_infos().distribution_version),
+            ('DIST_CODENAME', lambda config: dist_infos().distribution_codename),
             ('PKG_DISTRIBUTION', args.package_distribution),
             ('PROJECT_VERSION', args.project_version),
             ('PROJECT_NAME', args.project_name),
@@ -459,12 +656,23 @@ def make_config(args: argparse.Namespace) -> Dict[str, str]:
             ('ARCH', args.arch),
             ('UTC', args.utc or '0200'),
         )
-    ))
+    )))
+
 
-    if args.target_file is not None:
-        read_config(args.target_file, config)
+def make_target_config(base_config: Dict[str, str],
+                       target_file: Optional[TextIO],
+                       variables: Iterable[str],
+                       origins: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    config = base_config.copy()
 
-    variable_errors = update_config_variables(config, args.variable)
+    if target_file is not None:
+        read_config(target_file, config, origins=origins)
+
+    variables = list(variables)
+    variable_errors = update_config_variables(config, variables)
+    if origins is not None:
+        for var in variables:
+            origins[var.partition('=')[0].rstrip('+')] = '-s / --variable'
     if variable_errors:
         errors = '", "'.join(variable_errors)
         raise PackagerError(f'Parse error on -s / --variable: "{errors}"')
@@ -474,36 +682,54 @@ def make_config(args: argparse.Namespace) -> Dict[str, str]:
     return config
 
 
+def make_config(args: argparse.Namespace,
+                origins: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    return make_target_config(make_base_config(args), args.target_file, args.variable, origins)
+
+
 def cmd_show_config(args: argparse.Namespace, hook: Hook) -> None:
-    config = make_config(args)
+    origins = {} if args.show_origins else None
+    config = make_config(args, origins)
     if config.get('PROJECT_VERSION') is None and args.version_file:
         version = read_version_from_file_or_die(args.pattern_version,
                                                 args.version_file,
                                                 hook.normalize_version)
         config['PROJECT_VERSION'] = version
-    print_config(config)
+    print_config(config, origins)
 
 
 def cmd_build(args: argparse.Namespace, hook: Hook) -> None:
-    if args.check_uncommited and not args.no_check:
-        changes = git_uncommited_changes()
+    check_uncommited = args.check_uncommited and not args.no_check
+    check_version = args.check_version and not args.no_check
+
+    # git commands are independent
+    with span('git checks'):
+        changes, last_tag = run_concurrently(
+            async_git_uncommited_changes() if check_uncommited else None,
+            async_git_last_tag(persistent_cache=args.git_describe_cache)
+            if check_version else None,
+            ordered_errors=True,
+        )
+
+    if check_uncommited:
         if changes:
             raise PackagerError(f'Your repository has uncommited changes:\n{changes}\n'
                                 'Please commit before packaging or use --no-check-uncommited')
 
-    config = make_config(args)
+    with span('config'):
+        config = make_config(args)
 
     # read version
     project_version = config.get('PROJECT_VERSION')
     if project_version is None and args.version_file:
-        project_version = read_version_from_file_or_die(args.pattern_version,
-                                                        args.version_file,
-                                                        hook.normalize_version)
+        with span('read version'):
+            project_version = read_version_from_file_or_die(args.pattern_version,
+                                                            args.version_file,
+                                                            hook.normalize_version)
         config['PROJECT_VERSION'] = project_version
 
     # check version
-    if args.check_version and not args.no_check:
-        last_tag = git_last_tag()
+    if check_version:
         if project_version != last_tag:
             raise PackagerError(
                 'Repository head mismatch current version.\n'
@@ -512,29 +738,141 @@ def cmd_build(args: argparse.Namespace, hook: Hook) -> None:
                 'Ignored with --no-check-version')
 
     # remove old build directory
-    remove_directory(args.output_build)
+    manifest = None
+    if args.incremental:
+        manifest = BuildManifest(args.build_manifest
+                                 or default_manifest_path(args.output_build),
+                                 args.output_build)
+    else:
+        with span('remove build directory'):
+            remove_directory(args.output_build)
 
     # create buid directory
-    for dirname in args.package_template_dir:
-        create_build_directory(dirname, args.output_build, config)
+    with span('render') as s:
+        template_cache = TemplateCache(args.template_cache)
+        build_files = collect_build_files(args.package_template_dir, config, args.jobs)
+        s.set(files=len(build_files))
+        write_build_files(build_files, args.output_build, template_cache, manifest,
+                          args.jobs, args.copy_mode)
+        template_cache.save()
+        if manifest is not None:
+            manifest.save()
 
     # buid package
     if args.build_package:
-        shell_run(['dpkg-buildpackage', '-b', '-tc', '-us', '-uc', '-r'])
+        with span('dpkg-buildpackage'):
+            shell_run(['dpkg-buildpackage', '-b', '-tc', '-us', '-uc', '-r'])
 
     if not args.no_clean:
-        remove_directory(args.output_build)
+        with span('remove build directory'):
+            remove_directory(args.output_build)
+
+
+def expand_target_files(patterns: Iterable[str]) -> List[str]:
+    target_files: Dict[str, None] = {}
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not paths:
+            raise PackagerError(f'No target file match {pattern}')
+        target_files.update(dict.fromkeys(paths))
+    return list(target_files)
+
+
+def output_build_paths(output_build: str, target_files: Iterable[str]) -> List[str]:
+    """Build directory of each target: output_build/basename(target_file)"""
+    paths: Dict[str, str] = {}
+    for target_file in target_files:
+        name = os.path.basename(target_file)
+        previous = paths.get(name)
+        if previous is not None:
+            raise PackagerError(f'{previous} and {target_file} have the same build directory'
+                                f' {os.path.join(output_build, name)}')
+        paths[name] = target_file
+    return [os.path.join(output_build, name) for name in paths]
+
+
+class TargetTiming(NamedTuple):
+    target_file: str
+    output_build: str
+    seconds: float
+
+
+def print_target_timings(timings: Iterable[TargetTiming]) -> None:
+    timings = list(timings)
+    width = max(len(timing.target_file) for timing in timings)
+    for target_file, output_build, seconds in timings:
+        print(f'{target_file:<{width}}  {seconds * 1000:8.1f} ms  -> {output_build}')
+    print(f'{"total":<{width}}  {sum(t.seconds for t in timings) * 1000:8.1f} ms')
+
+
+def cmd_build_matrix(args: argparse.Namespace, hook: Hook) -> None:
+    target_files = expand_target_files(args.target_files)
+    output_builds = output_build_paths(args.output_build, target_files)
+
+    # shared by all targets
+    base_config = make_base_config(args)
+    if base_config.get('PROJECT_VERSION') is None and args.version_file:
+        base_config['PROJECT_VERSION'] = read_version_from_file_or_die(args.pattern_version,
+                                                                       args.version_file,
+                                                                       hook.normalize_version)
+    template_cache = TemplateCache(args.template_cache)
+
+    timings = []
+    for target_file, output_build in zip(target_files, output_builds):
+        start = time.perf_counter()
+
+        with open(target_file, encoding='utf-8') as f:
+            config = make_target_config(base_config, f, args.variable)
+
+        os.makedirs(args.output_build, exist_ok=True)
+        manifest = None
+        if args.incremental:
+            manifest = BuildManifest(default_manifest_path(output_build), output_build)
+        else:
+            remove_directory(output_build)
+
+        build_files = collect_build_files(args.package_template_dir, config, args.jobs)
+        write_build_files(build_files, output_build, template_cache, manifest,
+                          args.jobs, args.copy_mode)
+        if manifest is not None:
+            manifest.save()
+
+        timings.append(TargetTiming(target_file, output_build, time.perf_counter() - start))
+
+    template_cache.save()
+    print_target_timings(timings)
 
 
 def _cmd_sync_tag(version: str, args: argparse.Namespace, hook: Hook) -> None:
     project_path = os.getcwd()
-    chdir(args.updated_repo_path)
-    run_update_repo(lambda: hook.update_repo(version, project_path, args),
-                    DEFAULT_UPDATED_REPO_NAME,
-                    args.updated_repo_branch,
-                    not args.no_pull_for_updated_repo,
-                    None if args.no_commit_for_updated_repo \
-                        else f'{args.application_name} updated to {version}')
+    update_repo = functools.partial(hook.update_repo, version, project_path, args)
+    pull = not args.no_pull_for_updated_repo
+    commit_msg = None if args.no_commit_for_updated_repo \
+        else f'{args.application_name} updated to {version}'
+    repo_paths = args.updated_repo_path
+
+    if not args.yes:
+        # one repository after the other with confirmations
+        repo_paths = [os.path.abspath(path) for path in repo_paths]
+        for repo_path in repo_paths:
+            chdir(repo_path)
+            run_update_repo(update_repo,
+                            DEFAULT_UPDATED_REPO_NAME,
+                            args.updated_repo_branch,
+                            pull,
+                            commit_msg)
+        return
+
+    results = run_update_repos(update_repo, repo_paths,
+                               DEFAULT_UPDATED_REPO_NAME,
+                               args.updated_repo_branch,
+                               pull,
+                               commit_msg,
+                               jobs=args.jobs)
+    print_update_report(results)
+    failures = [result.repo_path for result in results if result.error is not None]
+    if failures:
+        raise PackagerError(f'Update failed for {", ".join(failures)}')
 
 
 def cmd_sync_tag(args: argparse.Namespace, hook: Hook) -> None:
@@ -550,15 +888,16 @@ def cmd_create_tag(args: argparse.Namespace, hook: Hook) -> None:
     if not args.no_update_for_updated_repo and args.updated_repo_path is None:
         raise PackagerError(f'use -U or add {DEFAULT_UPDATED_REPO_NAME} repository parameter')
 
-    content = args.version_file.read()
-    args.version_file.close()
-    extracted_version = extract_version_or_die(args.pattern_version,
-                                               content,
-                                               hook.normalize_version)
+    with span('read version'):
+        content = args.version_file.read()
+        args.version_file.close()
+        extracted_version = extract_version_or_die(args.pattern_version,
+                                                   content,
+                                                   hook.normalize_version)
 
     new_version = args.force_version
     if new_version is None:
-        new_version = extracted_version.version
+        version = version_key(extracted_version.version)
         new_version = f'{version[0]}.{version[1]}.{version[2] + 1}'
 
     # update changelog
@@ -588,12 +927,16 @@ def cmd_create_tag(args: argparse.Namespace, hook: Hook) -> None:
     #             pass
 
     pos = extracted_version.position
-    writeall(args.version_file.name,
-             f'{content[:pos[0]]}{new_version}{content[pos[1]:]}')
-    git_push_version(new_version)
+    with span('write version'):
+        writeall(args.version_file.name,
+                 f'{content[:pos[0]]}{new_version}{content[pos[1]:]}')
+    with span('push version'):
+        timings = git_push_version(new_version, args.remote)
+    print(', '.join(f'{t.step}: {t.elapsed:.3f}s' for t in timings))
 
     if not args.no_update_for_updated_repo:
-        _cmd_sync_tag(new_version, args, hook)
+        with span('sync tag'):
+            _cmd_sync_tag(new_version, args, hook)
 
 
 def add_parser_cmd_get_version(subparsers,
@@ -606,12 +949,24 @@ def add_parser_cmd_get_version(subparsers,
     return subparser
 
 
+def add_parser_cmd_scan_versions(subparsers,
+                                 cmd: Callable[[argparse.Namespace, Hook], None] = cmd_scan_versions
+                                 ) -> argparse.ArgumentParser:
+    subparser = subparsers.add_parser('scan-versions', aliases=['scan'],
+                                      help='Extract versions of many files and check they match')
+    add_arguments_for_scan_versions_command(subparser)
+    subparser.set_defaults(cmd_func=cmd)
+    return subparser
+
+
 def add_parser_cmd_config(subparsers,
                           cmd: Callable[[argparse.Namespace, Hook], None] = cmd_show_config
                           ) -> argparse.ArgumentParser:
     subparser = subparsers.add_parser('config', aliases=['c', 'config', 'show'],
                                       help='Show configuration')
     add_arguments_for_show_config_command(subparser)
+    subparser.add_argument('--show-origins', action='store_true',
+                           help='show the file that defines each variable')
     subparser.set_defaults(cmd_func=cmd)
     return subparser
 
@@ -626,6 +981,16 @@ def add_parser_cmd_build(subparsers,
     return subparser
 
 
+def add_parser_cmd_build_matrix(subparsers,
+                                cmd: Callable[[argparse.Namespace, Hook], None] = cmd_build_matrix
+                                ) -> argparse.ArgumentParser:
+    subparser = subparsers.add_parser('build-matrix', aliases=['m'],
+                                      help='Create build directories of several targets')
+    add_arguments_for_build_matrix_command(subparser)
+    subparser.set_defaults(cmd_func=cmd)
+    return subparser
+
+
 def add_parser_cmd_sync_tag(subparsers,
                             cmd: Callable[[argparse.Namespace, Hook], None] = cmd_sync_tag
                             ) -> argparse.ArgumentParser:
@@ -672,7 +1037,6 @@ def add_help_with_subparser(parser: argparse.ArgumentParser) -> List[argparse.Ar
                         help='show help message and exit')
     parser.add_argument('--help-all', nargs=0, action=Help, const=True,
                         help='show help message and exit')
-
     parser.set_defaults(cmd_func=lambda *args, **kargs: print_help(False))
     return printable_subparsers
 
@@ -681,11 +1045,15 @@ def argument_parser(description: str = 'Packager for proxies repositories'
                     ) -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=description, add_help=False)
     printable_subparsers = add_help_with_subparser(parser)
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write a Chrome trace-event JSON file (chrome://tracing, Perfetto)')
 
     subparsers = parser.add_subparsers(dest='selected_cmd')
     printable_subparsers.append(add_parser_cmd_get_version(subparsers))
+    printable_subparsers.append(add_parser_cmd_scan_versions(subparsers))
     printable_subparsers.append(add_parser_cmd_config(subparsers))
     printable_subparsers.append(add_parser_cmd_build(subparsers))
+    printable_subparsers.append(add_parser_cmd_build_matrix(subparsers))
     printable_subparsers.append(add_parser_cmd_create_tag(subparsers))
     printable_subparsers.append(add_parser_cmd_sync_tag(subparsers))
 
@@ -693,4 +1061,15 @@ def argument_parser(description: str = 'Packager for proxies repositories'
 
 
 def run_packager(args: argparse.Namespace, hook: Hook = Hook()) -> None:
-    args.cmd_func(args, hook=hook)
+    # parsers built without argument_parser() have no --trace
+    trace = getattr(args, 'trace', None)
+    if not trace:
+        args.cmd_func(args, hook=hook)
+        return
+
+    start_tracing()
+    try:
+        with span(args.selected_cmd or 'help'):
+            args.cmd_func(args, hook=hook)
+    finally:
+        stop_tracing(trace)
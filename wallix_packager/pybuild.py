@@ -25,7 +25,7 @@ def pybuild_parameters(config: Dict[str, str]) -> Dict[str, Dict[str, str]]:
     pybuilds = (ver for ver in pybuilds if ver in PYBUILD_MAPPING)
     configs_params = {}
     for py_ver in pybuilds:
-        updated_config = dict(config)
+        updated_config = config.copy()
         updated_config.update(
             (key, config.get(value))
             for key, value in PYVERSION_MAPPING[py_ver]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Replace version references of many files in a single pass
+##
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Set, Tuple, NamedTuple, Optional
+from .error import PackagerError
+from .io import writeall_atomic
+from .version import regex_version_or_die
+from .version_scanner import VersionRule, match_files
+
+
+class ChangedSpan(NamedTuple):
+    rule: VersionRule
+    # byte offsets in the original file
+    position: Tuple[int, int]
+    old_text: str
+    new_text: str
+
+
+class FileUpdate(NamedTuple):
+    filename: str
+    # only references whose value changed
+    spans: List[ChangedSpan]
+    # number of references found (changed or not)
+    matches: int
+
+
+class _PendingUpdate(NamedTuple):
+    file_update: FileUpdate
+    found_rules: Set[VersionRule]
+    path: str
+    # None when unchanged
+    content: Optional[bytes]
+    mode: int
+
+    def write(self) -> None:
+        if self.content is not None:
+            writeall_atomic(self.path, self.content, mode=self.mode)
+
+
+def _prepare_update(root: str, filename: str, rules: Iterable[VersionRule],
+                    version: str) -> _PendingUpdate:
+    path = os.path.join(root, filename)
+    with open(path, 'rb') as f:
+        content = f.read()
+        mode = os.fstat(f.fileno()).st_mode & 0o7777
+
+    new_value = version.encode()
+    references: List[Tuple[Tuple[int, int], VersionRule]] = []
+    for rule in rules:
+        for m in regex_version_or_die(rule.pattern.encode()).finditer(content):
+            # optional group that does not participate in the match
+            if m.start(1) != -1:
+                references.append((m.span(1), rule))
+    references.sort(key=lambda ref: ref[0])
+
+    parts = []
+    spans = []
+    matches = 0
+    pos = 0
+    previous: Optional[Tuple[int, int]] = None
+    for span, rule in references:
+        if span == previous:
+            # same reference found by several rules
+            continue
+        if previous is not None and span[0] < previous[1]:
+            raise PackagerError(f'{filename}: overlapping references at {previous} and {span}')
+        previous = span
+        matches += 1
+        old_value = content[span[0]:span[1]]
+        if old_value != new_value:
+            parts += (content[pos:span[0]], new_value)
+            pos = span[1]
+            spans.append(ChangedSpan(rule, span, old_value.decode(errors='replace'), version))
+
+    new_content = None
+    if spans:
+        parts.append(content[pos:])
+        new_content = b''.join(parts)
+
+    return _PendingUpdate(FileUpdate(filename, spans, matches),
+                          {rule for _, rule in references},
+                          path, new_content, mode)
+
+
+def update_file(root: str, filename: str, rules: Iterable[VersionRule],
+                version: str, dry_run: bool = False) -> FileUpdate:
+    """
+    Replace the first group of every match of every rule with version.
+    The file is read once and written (atomically) only when it changes.
+    """
+    pending = _prepare_update(root, filename, rules, version)
+    if not dry_run:
+        pending.write()
+    return pending.file_update
+
+
+def update_references(root: str, rules: Iterable[VersionRule], version: str,
+                      jobs: int = 1, dry_run: bool = False) -> List[FileUpdate]:
+    """
+    Apply rules to every file of root and return files with at least one
+    reference, sorted by name.
+    Nothing is written and PackagerError is raised when a rule finds no reference.
+    """
+    rules = list(rules)
+    for rule in rules:
+        if regex_version_or_die(rule.pattern.encode()).groups < 1:
+            raise PackagerError(f'No group for the version in pattern\n'
+                                f'glob = {rule.glob}, pattern = {rule.pattern}')
+
+    files = match_files(root, rules)
+
+    def prepare(item: Tuple[str, List[VersionRule]]) -> _PendingUpdate:
+        return _prepare_update(root, item[0], item[1], version)
+
+    if jobs > 1:
+        with ThreadPoolExecutor(jobs) as executor:
+            pending_updates = list(executor.map(prepare, files))
+    else:
+        pending_updates = list(map(prepare, files))
+
+    found_rules: Set[VersionRule] = set()
+    for pending in pending_updates:
+        found_rules.update(pending.found_rules)
+    not_found = [rule for rule in rules if rule not in found_rules]
+    if not_found:
+        raise PackagerError('Reference version not found\n' + '\n'.join(
+            f'glob = {rule.glob}, pattern = {rule.pattern}' for rule in not_found))
+
+    if not dry_run:
+        for pending in pending_updates:
+            pending.write()
+
+    return [pending.file_update for pending in pending_updates if pending.file_update.matches]
+
+
+def print_reference_updates(updates: Iterable[FileUpdate]) -> None:
+    for filename, spans, matches in updates:
+        if not spans:
+            print(f'{filename}: up to date ({matches} references)')
+        for span in spans:
+            print(f'{filename}:{span.position[0]}-{span.position[1]}:'
+                  f' {span.old_text} -> {span.new_text}')
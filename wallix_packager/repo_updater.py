@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
 
+import os
+import sys
+import time
 import argparse
-from typing import Callable, Optional
+import tempfile
+import multiprocessing
+from abc import ABC, abstractmethod
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+from .error import PackagerError
+from .runner import is_real_runner
 from .shell import confirm, shell_cmd, shell_run
+from .tracing import span, is_tracing, start_tracing, stop_tracing, add_trace_events
 
 
 def argument_parser(project_name: str, default_branch: str, description: str = '') -> argparse.ArgumentParser:
@@ -14,32 +24,193 @@ def argument_parser(project_name: str, default_branch: str, description: str = '
     return parser
 
 
+class UpdatePolicy(ABC):
+    """Answers to the questions of run_update_repo()"""
+
+    @abstractmethod
+    def use_branch(self, project_name: str, branch: str) -> bool:
+        ...
+
+    @abstractmethod
+    def review_changes(self, project_name: str, cwd: Optional[str]) -> None:
+        """Called before git commit"""
+
+    @abstractmethod
+    def push(self, project_name: str, branch: str) -> bool:
+        ...
+
+
+class InteractivePolicy(UpdatePolicy):
+    def use_branch(self, project_name, branch):
+        return confirm(f'Use "{branch}" branch for "{project_name}" ?')
+
+    def review_changes(self, project_name, cwd):
+        if confirm('git diff ?'):
+            shell_run(('git', 'diff'), cwd=cwd)
+
+    def push(self, project_name, branch):
+        return confirm(f'git push origin "{branch}" on "{project_name}" repository ?')
+
+
+class UnattendedPolicy(UpdatePolicy):
+    """Never ask, the diff is kept in self.diff"""
+
+    def __init__(self, push: bool = True):
+        self.push_enabled = push
+        self.diff = ''
+
+    def use_branch(self, project_name, branch):
+        return True
+
+    def review_changes(self, project_name, cwd):
+        self.diff = shell_cmd(('git', 'diff'), cwd=cwd)
+
+    def push(self, project_name, branch):
+        return self.push_enabled
+
+
 def run_update_repo(update_repo: Callable[[], None],
                     project_name: str,
                     branch: str,
                     pull: bool,
-                    commit_msg: Optional[str]) -> bool:
-    if not confirm(f'Use "{branch}" branch for "{project_name}" ?'):
+                    commit_msg: Optional[str],
+                    policy: Optional[UpdatePolicy] = None,
+                    cwd: Optional[str] = None) -> bool:
+    """
+    Switch to branch, run update_repo() then commit and push.
+    Without policy, questions are asked on the terminal.
+    """
+    if policy is None:
+        policy = InteractivePolicy()
+
+    if not policy.use_branch(project_name, branch):
         return False
 
-    shell_run(('git', 'fetch', '--tags', '--all', '-a'))
-    shell_run(('git', 'switch', branch))
+    shell_run(('git', 'fetch', '--tags', '--all', '-a'), cwd=cwd)
+    shell_run(('git', 'switch', branch), cwd=cwd)
 
     if pull:
-        shell_run(('git', 'pull', 'origin', branch, '--rebase'))
+        shell_run(('git', 'pull', 'origin', branch, '--rebase'), cwd=cwd)
 
     update_repo()
 
     print(f'echo "{project_name}": git status before git commit -a')
-    shell_run(('git', 'status', '-s'))
+    shell_run(('git', 'status', '-s'), cwd=cwd)
 
-    if confirm('git diff ?'):
-        shell_run(('git', 'diff'))
+    policy.review_changes(project_name, cwd)
 
     if commit_msg:
-        shell_run(('git', 'commit', '-am', commit_msg))
+        shell_run(('git', 'commit', '-am', commit_msg), cwd=cwd)
 
-        if confirm(f'git push origin "{branch}" on "{project_name}" repository ?'):
-            shell_run(('git', 'push', 'origin', branch))
+        if policy.push(project_name, branch):
+            shell_run(('git', 'push', 'origin', branch), cwd=cwd)
 
     return True
+
+
+class RepoUpdateResult(NamedTuple):
+    repo_path: str
+    # None when the update succeeded
+    error: Optional[str]
+    diff: str
+    # output of commands
+    log: str
+    seconds: float
+    # spans of the worker process, empty when tracing is disabled
+    trace_events: List[Dict[str, Any]]
+
+
+# inherited by forked workers (not pickled)
+_batch_update_repo: Optional[Callable[[], None]] = None
+
+
+def _set_batch_update_repo(update_repo: Callable[[], None]) -> None:
+    global _batch_update_repo
+    _batch_update_repo = update_repo
+
+
+def _update_repo_process(repo_path: str, project_name: str, branch: str, pull: bool,
+                         commit_msg: Optional[str], push: bool) -> RepoUpdateResult:
+    start = time.perf_counter()
+    policy = UnattendedPolicy(push)
+    error = None
+    # the tracer inherited from the parent is replaced with an empty one,
+    # events are sent back with the result
+    tracing = is_tracing()
+    if tracing:
+        start_tracing()
+    # line buffering: python and command outputs stay in order
+    with tempfile.TemporaryFile('w+', buffering=1) as log:
+        # the process is dedicated to this repository: outputs of commands
+        # and the working directory can be changed
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        with redirect_stdout(log), redirect_stderr(log):
+            try:
+                with span('update repository', repo=repo_path):
+                    os.chdir(repo_path)
+                    run_update_repo(_batch_update_repo, project_name, branch, pull,
+                                    commit_msg, policy)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        log.seek(0)
+        output = log.read()
+    tracer = stop_tracing() if tracing else None
+    return RepoUpdateResult(repo_path, error, policy.diff, output,
+                            time.perf_counter() - start,
+                            tracer.events if tracer else [])
+
+
+def run_update_repos(update_repo: Callable[[], None],
+                     repo_paths: Iterable[str],
+                     project_name: str,
+                     branch: str,
+                     pull: bool,
+                     commit_msg: Optional[str],
+                     push: bool = True,
+                     jobs: int = 4) -> List[RepoUpdateResult]:
+    """
+    run_update_repo() without question for each repository, with at most
+    jobs repositories at the same time.
+    Each repository is updated in a new process with the repository as
+    working directory (update_repo() is called from there).
+    Spans of workers are added to the current trace.
+    """
+    repo_paths = [os.path.abspath(path) for path in repo_paths]
+    if not repo_paths:
+        return []
+
+    # commands of workers would be missing from the cassette or replayed
+    # from a copy of the cassette in each process
+    if not is_real_runner():
+        raise PackagerError('Commands of repositories updated in parallel cannot be'
+                            ' recorded or replayed')
+
+    # fork: update_repo is inherited and does not need to be picklable
+    context = multiprocessing.get_context('fork')
+    # maxtasksperchild=1: a new process per repository
+    with context.Pool(min(jobs, len(repo_paths)),
+                      initializer=_set_batch_update_repo,
+                      initargs=(update_repo,),
+                      maxtasksperchild=1) as pool:
+        async_results = [pool.apply_async(_update_repo_process,
+                                          (path, project_name, branch, pull, commit_msg, push))
+                         for path in repo_paths]
+        results = [result.get() for result in async_results]
+
+    for result in results:
+        add_trace_events(result.trace_events)
+    return results
+
+
+def print_update_report(results: Iterable[RepoUpdateResult]) -> None:
+    for result in results:
+        status = '\x1b[32mok\x1b[0m' if result.error is None else '\x1b[31mfailed\x1b[0m'
+        print(f'== {result.repo_path}: {status} ({result.seconds * 1000:.1f} ms) ==')
+        if result.error is not None:
+            print(result.log, end='')
+            print(result.error)
+        elif result.diff:
+            print(result.diff, end='')
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Command runners used by shell_cmd / shell_run
+##
+
+import os
+import json
+import time
+import atexit
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+from .error import PackagerError
+
+RUNNER_MODES = ('real', 'record', 'replay')
+
+
+class CommandRunner(ABC):
+    """Execute commands of shell_cmd() and shell_run()"""
+
+    @abstractmethod
+    def check_output(self, cmd: Sequence[str], env: Optional[Dict[str, str]],
+                     cwd: Optional[str]) -> str:
+        ...
+
+    @abstractmethod
+    def run(self, cmd: Sequence[str], env: Optional[Dict[str, str]],
+            check: bool, cwd: Optional[str]) -> subprocess.CompletedProcess:
+        ...
+
+    def iter_lines(self, cmd: Sequence[str], env: Optional[Dict[str, str]],
+                   cwd: Optional[str]) -> Iterator[str]:
+        """Lines of output without newline, CalledProcessError is raised at the end"""
+        return iter(self.check_output(cmd, env, cwd).splitlines())
+
+
+class SubprocessRunner(CommandRunner):
+    def check_output(self, cmd, env, cwd):
+        return subprocess.check_output(cmd, env=env, cwd=cwd, text=True)
+
+    def iter_lines(self, cmd, env, cwd):
+        with subprocess.Popen(cmd, env=env, cwd=cwd, text=True,
+                              stdout=subprocess.PIPE) as process:
+            try:
+                for line in process.stdout:
+                    yield line.rstrip('\n')
+            except GeneratorExit:
+                # the consumer stopped before the end of output
+                process.kill()
+                raise
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+
+    def run(self, cmd, env, check, cwd):
+        return subprocess.run(cmd, env=env, check=check, cwd=cwd)
+
+
+class RecordingRunner(CommandRunner):
+    """
+    Execute commands with runner and record them into a cassette file
+    (argv, exit code, output and duration).
+    """
+
+    def __init__(self, cassette: str, runner: Optional[CommandRunner] = None):
+        self.cassette = cassette
+        self.runner = runner or SubprocessRunner()
+        self.interactions: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _record(self, kind: str, cmd: Sequence[str], cwd: Optional[str],
+                start: float, returncode: int, output: Any) -> None:
+        with self._lock:
+            self.interactions.append({
+                'kind': kind,
+                'argv': list(cmd),
+                'cwd': cwd,
+                'returncode': returncode,
+                'output': output,
+                'duration': time.perf_counter() - start,
+            })
+
+    def check_output(self, cmd, env, cwd):
+        start = time.perf_counter()
+        try:
+            output = self.runner.check_output(cmd, env, cwd)
+        except subprocess.CalledProcessError as e:
+            self._record('output', cmd, cwd, start, e.returncode, e.output)
+            raise
+        self._record('output', cmd, cwd, start, 0, output)
+        return output
+
+    def run(self, cmd, env, check, cwd):
+        start = time.perf_counter()
+        try:
+            result = self.runner.run(cmd, env, check, cwd)
+        except subprocess.CalledProcessError as e:
+            self._record('run', cmd, cwd, start, e.returncode, None)
+            raise
+        self._record('run', cmd, cwd, start, result.returncode, None)
+        return result
+
+    def iter_lines(self, cmd, env, cwd):
+        start = time.perf_counter()
+        lines = []
+        try:
+            for line in self.runner.iter_lines(cmd, env, cwd):
+                lines.append(line)
+                yield line
+        except subprocess.CalledProcessError as e:
+            self._record('lines', cmd, cwd, start, e.returncode, lines)
+            raise
+        self._record('lines', cmd, cwd, start, 0, lines)
+
+    def save(self) -> None:
+        with self._lock:
+            data = {'interactions': self.interactions}
+        with open(self.cassette, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+
+
+class ReplayError(PackagerError):
+    pass
+
+
+class ReplayRunner(CommandRunner):
+    """
+    Replay a cassette without executing anything.
+    Each recorded duration is multiplied by latency_scale and slept
+    (0 replays as fast as possible).
+    """
+
+    def __init__(self, cassette: str, latency_scale: float = 0):
+        with open(cassette, encoding='utf-8') as f:
+            self.interactions: List[Dict[str, Any]] = json.load(f)['interactions']
+        self.latency_scale = latency_scale
+        # first unused interaction
+        self.position = 0
+        self._used: Set[int] = set()
+        # sum of simulated command durations
+        self.command_time = 0.0
+        self._lock = threading.Lock()
+
+    def _next(self, kind: str, cmd: Sequence[str], cwd: Optional[str]) -> Dict[str, Any]:
+        argv = list(cmd)
+        with self._lock:
+            # commands run concurrently may be recorded in any order:
+            # take the first unused interaction with the same command and directory
+            for i in range(self.position, len(self.interactions)):
+                interaction = self.interactions[i]
+                if i not in self._used and interaction['kind'] == kind \
+                        and interaction['argv'] == argv and interaction['cwd'] == cwd:
+                    break
+            else:
+                if self.position < len(self.interactions):
+                    interaction = self.interactions[self.position]
+                    expected = f'{interaction["argv"]} in {interaction["cwd"]}'
+                else:
+                    expected = 'end of cassette'
+                raise ReplayError(f'Unexpected command: {argv} in {cwd} (expected: {expected})')
+            self._used.add(i)
+            while self.position in self._used:
+                self.position += 1
+            self.command_time += interaction['duration']
+
+        if self.latency_scale:
+            time.sleep(interaction['duration'] * self.latency_scale)
+        return interaction
+
+    def check_output(self, cmd, env, cwd):
+        interaction = self._next('output', cmd, cwd)
+        if interaction['returncode']:
+            raise subprocess.CalledProcessError(interaction['returncode'], cmd,
+                                                interaction['output'])
+        return interaction['output']
+
+    def run(self, cmd, env, check, cwd):
+        interaction = self._next('run', cmd, cwd)
+        if check and interaction['returncode']:
+            raise subprocess.CalledProcessError(interaction['returncode'], cmd)
+        return subprocess.CompletedProcess(cmd, interaction['returncode'])
+
+    def iter_lines(self, cmd, env, cwd):
+        interaction = self._next('lines', cmd, cwd)
+        yield from interaction['output']
+        if interaction['returncode']:
+            raise subprocess.CalledProcessError(interaction['returncode'], cmd)
+
+    def is_finished(self) -> bool:
+        return self.position == len(self.interactions)
+
+
+_runner: Optional[CommandRunner] = None
+
+
+def set_runner(runner: Optional[CommandRunner]) -> Optional[CommandRunner]:
+    """Replace the current runner (None for the default one) and return the previous"""
+    global _runner
+    previous = _runner
+    _runner = runner
+    return previous
+
+
+def runner_from_environment() -> CommandRunner:
+    """
+    PACKAGER_RUNNER: real (default), record or replay
+    PACKAGER_CASSETTE: cassette file for record and replay
+    PACKAGER_REPLAY_LATENCY: scale of recorded durations (default: 0)
+    """
+    mode = os.environ.get('PACKAGER_RUNNER', 'real')
+    if mode not in RUNNER_MODES:
+        raise PackagerError(f'Invalid PACKAGER_RUNNER: {mode} (expected {", ".join(RUNNER_MODES)})')
+    if mode == 'real':
+        return SubprocessRunner()
+
+    cassette = os.environ.get('PACKAGER_CASSETTE')
+    if not cassette:
+        raise PackagerError(f'PACKAGER_RUNNER={mode} requires PACKAGER_CASSETTE')
+
+    if mode == 'record':
+        runner = RecordingRunner(cassette)
+        atexit.register(runner.save)
+        return runner
+
+    return ReplayRunner(cassette, float(os.environ.get('PACKAGER_REPLAY_LATENCY', '0')))
+
+
+def get_runner() -> CommandRunner:
+    global _runner
+    if _runner is None:
+        _runner = runner_from_environment()
+    return _runner
+
+
+def is_real_runner() -> bool:
+    return type(get_runner()) is SubprocessRunner
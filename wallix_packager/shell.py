@@ -10,7 +10,14 @@
 import re
 import sys
 import subprocess
-from typing import Dict, Tuple, Sequence, Optional
+from typing import Dict, Tuple, Iterator, Sequence, Optional, TYPE_CHECKING
+from .tracing import span
+from .runner import get_runner
+from .describe_cache import describe_cache, cache_entry
+
+if TYPE_CHECKING:
+    from .tag_index import TagIndex
+    from .git_session import GitSession
 
 
 is_safe_word = re.compile(r'^[-\w@./:,%@_=^]+$')
@@ -28,16 +35,47 @@ def print_cmd(cmd: Sequence[str]) -> None:
 
 
 # TODO rename to output_shell
-def shell_cmd(cmd: Sequence[str], env: Optional[Dict[str, str]] = None) -> str:
+def shell_cmd(cmd: Sequence[str], env: Optional[Dict[str, str]] = None,
+              cwd: Optional[str] = None) -> str:
+    print_cmd(cmd)
+    with span('shell_cmd', cat='shell', argv=list(cmd)) as s:
+        try:
+            output = get_runner().check_output(cmd, env, cwd)
+        except subprocess.CalledProcessError as e:
+            s.set(exit_code=e.returncode)
+            raise
+        s.set(exit_code=0)
+        return output
+
+
+def shell_lines(cmd: Sequence[str], env: Optional[Dict[str, str]] = None,
+                cwd: Optional[str] = None) -> Iterator[str]:
+    """
+    Like shell_cmd(), but output lines (without newline) are yielded as
+    soon as they are read. CalledProcessError is raised after the last line.
+    """
     print_cmd(cmd)
-    return subprocess.check_output(cmd, env=env, text=True)
+    with span('shell_lines', cat='shell', argv=list(cmd)) as s:
+        try:
+            yield from get_runner().iter_lines(cmd, env, cwd)
+        except subprocess.CalledProcessError as e:
+            s.set(exit_code=e.returncode)
+            raise
+        s.set(exit_code=0)
 
 
 # TODO rename to run_shell
 def shell_run(cmd: Sequence[str], env: Optional[Dict[str, str]] = None,
-              check: bool = True) -> subprocess.CompletedProcess:
+              check: bool = True, cwd: Optional[str] = None) -> subprocess.CompletedProcess:
     print_cmd(cmd)
-    return subprocess.run(cmd, env=env, check=check)
+    with span('shell_run', cat='shell', argv=list(cmd)) as s:
+        try:
+            result = get_runner().run(cmd, env, check, cwd)
+        except subprocess.CalledProcessError as e:
+            s.set(exit_code=e.returncode)
+            raise
+        s.set(exit_code=result.returncode)
+        return result
 
 
 def errexit(msg) -> None:
@@ -69,35 +107,55 @@ def git_uncommited_changes() -> str:
     return shell_cmd(['git', 'diff', '--shortstat'])
 
 
-def git_tag_exists(tag: str) -> Tuple[bool, str]:
-    # local tag
-    tags = shell_cmd(['git', 'tag', '--list'])
-    if tag in tags.split('\n'):
-        return (True, 'local')
-
-    # remote tag
-    tags = shell_cmd(['git', 'ls-remote', '--tags', 'origin'])
-    # tags contents:
-    # 7b997fa58cd40848273c4b1469c787b0cdd69e84        refs/tags/9.1.33
-    # dd3d667d68906c77e6fc47b5b8d19ff12fc47104        refs/tags/9.1.35
-    #                                                          ^      \n
-    if f'/{tag}\n' in tags:
-        return (True, 'remote')
+def git_tag_exists(tag: str, tag_index: Optional['TagIndex'] = None,
+                   session: Optional['GitSession'] = None) -> Tuple[bool, str]:
+    """
+    Search the tag in local then remote tags.
+    Use a shared tag_index to check several tags with a single git call.
+    """
+    if tag_index is None:
+        from .tag_index import TagIndex
+        tag_index = TagIndex(session=session)
+    return tag_index.exists(tag)
 
-    return (False, '')
 
-
-def git_last_tag() -> str:
+def parse_git_describe(tag: str) -> str:
     # tag-N-HASH
-    tag = shell_cmd(['git', 'describe', '--tags'])
-    m = re.search('-\\d+-g[0-9a-f]{8,10}\n?$', tag)
+    m = re.search('-\\d+-g[0-9a-f]{4,40}\n?$', tag)
     if m is None:
         return tag.strip()
     return tag[:m.start(0)]
 
 
-def git_current_branch() -> str:
+def git_describe_tags(cwd: Optional[str] = None, persistent_cache: bool = False) -> str:
+    """
+    Output of `git describe --tags` cached by HEAD commit and tags state.
+    With persistent_cache, the result is also shared with other processes.
+    """
+    entry = cache_entry(cwd)
+    if entry is not None:
+        output = describe_cache.get(*entry, persistent_cache)
+        if output is not None:
+            return output
+
+    output = shell_cmd(['git', 'describe', '--tags'], cwd=cwd)
+    if entry is not None:
+        describe_cache.set(*entry, output, persistent_cache)
+    return output
+
+
+def git_last_tag(cwd: Optional[str] = None, persistent_cache: bool = False) -> str:
+    return parse_git_describe(git_describe_tags(cwd, persistent_cache))
+
+
+def git_current_branch(session: Optional['GitSession'] = None,
+                       cwd: Optional[str] = None) -> str:
+    if session is not None:
+        branch = session.current_branch()
+        if branch is not None:
+            return branch
+
     # refs/heads/BRANCH
-    branch = shell_cmd(['git', 'symbolic-ref', 'HEAD'])
+    branch = shell_cmd(['git', 'symbolic-ref', 'HEAD'], cwd=cwd)
     prefix = 'refs/heads/'
     return branch[len(prefix):-1] if branch.startswith(prefix) else branch[:-1]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Multiplexed ssh connections (ControlMaster) shared by commands
+##
+
+import os
+import atexit
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional
+from .shell import shell_cmd, shell_run
+from .tracing import span
+
+
+class SSHPool:
+    """
+    One ssh master connection per user@host. Commands run through the
+    master socket and skip the key exchange and authentication.
+
+    Sockets are created in a private temporary directory, close() stops
+    the masters and removes it. Unused masters exit after persist seconds.
+    When a master cannot be started, commands use plain ssh connections.
+    """
+
+    def __init__(self, ssh: str = 'ssh', control_dir: Optional[str] = None,
+                 persist: int = 60):
+        self.ssh = ssh
+        self.persist = persist
+        self._control_dir = control_dir
+        self._own_control_dir = control_dir is None
+        # None when the master could not be started
+        self._masters: Dict[str, Optional[str]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'SSHPool':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def control_path(self, address: str) -> str:
+        if self._control_dir is None:
+            # short path: the length of a unix socket path is limited
+            self._control_dir = tempfile.mkdtemp(prefix='packager-ssh-')
+        name = hashlib.sha1(address.encode()).hexdigest()[:16]
+        return os.path.join(self._control_dir, name)
+
+    def _address_lock(self, address: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(address)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[address] = lock
+            return lock
+
+    def master(self, address: str) -> Optional[str]:
+        """
+        Start the master connection of address if needed and return its socket.
+        None when the master cannot be started.
+        """
+        with self._address_lock(address):
+            if address in self._masters:
+                return self._masters[address]
+            with self._lock:
+                control_path: Optional[str] = self.control_path(address)
+            with span('ssh master', cat='ssh', address=address) as s:
+                # -f: go to background after authentication
+                returncode = shell_run([self.ssh, '-M', '-N', '-f',
+                                        '-o', f'ControlPath={control_path}',
+                                        '-o', f'ControlPersist={self.persist}',
+                                        address], check=False).returncode
+                if returncode != 0:
+                    print(f'ssh master connection to {address} failed ({returncode}),'
+                          ' commands use separate connections')
+                    s.set(error=returncode)
+                    control_path = None
+            self._masters[address] = control_path
+            return control_path
+
+    def command(self, address: str, cmd: str) -> List[str]:
+        """ssh command line that runs cmd through the master connection"""
+        control_path = self.master(address)
+        if control_path is None:
+            return [self.ssh, address, cmd]
+        return [self.ssh, '-o', f'ControlPath={control_path}', '-o', 'ControlMaster=no',
+                address, cmd]
+
+    def run(self, address: str, cmd: str) -> str:
+        return shell_cmd(self.command(address, cmd))
+
+    def close(self) -> None:
+        with self._lock:
+            masters = self._masters
+            self._masters = {}
+            self._locks = {}
+        for address, control_path in masters.items():
+            if control_path is None:
+                continue
+            shell_run([self.ssh, '-o', f'ControlPath={control_path}', '-O', 'exit', address],
+                      check=False)
+        if self._own_control_dir and self._control_dir is not None:
+            shutil.rmtree(self._control_dir, ignore_errors=True)
+            self._control_dir = None
+
+
+_default_pool: Optional[SSHPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def default_ssh_pool() -> SSHPool:
+    """Pool shared by the process and closed at exit"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SSHPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -11,8 +11,14 @@
 import argparse
 import os
 import re
-from typing import Dict, Tuple, Optional, Iterable
-from .shell import shell_cmd
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, NamedTuple, Optional, Iterable
+from .shell import shell_cmd, shell_run
+from .error import PackagerError
+from .tracing import span
+from .ssh_pool import SSHPool, default_ssh_pool
 
 
 def chdir(path: str) -> None:
@@ -20,30 +26,96 @@ def chdir(path: str) -> None:
     os.chdir(path)
 
 
-def fetch_clone(local_path: str, remote_path: str, ssh_address: str, cmd: str) -> None:
+def fetch_clone(local_path: str, remote_path: str, ssh_address: str, cmd: str,
+                ssh_pool: Optional[SSHPool] = None) -> None:
     print(f"== Synchronize {local_path} clone repository ==")
-    print(shell_cmd(('ssh', ssh_address, f'cd {remote_path}; {cmd}')))
+    remote_cmd = f'cd {remote_path}; {cmd}'
+    if ssh_pool is None:
+        print(shell_cmd(('ssh', ssh_address, remote_cmd)))
+    else:
+        print(ssh_pool.run(ssh_address, remote_cmd))
 
 
-def set_commit(local_path: str, commit_hash: str) -> None:
-    print(f"== Setting {local_path} repository to commit {commit_hash} ==")
-    chdir(local_path)
-    print(shell_cmd(('git', 'fetch', '--all')))
-    print(shell_cmd(('git', 'reset', '--hard', commit_hash)))
+class FetchOptions(NamedTuple):
+    # shallow fetch with N commits, deepened when a commit is not found
+    depth: Optional[int] = None
+    # partial clone filter (blob:none, ...)
+    filter: Optional[str] = None
+
+    def args(self) -> Tuple[str, ...]:
+        args: Tuple[str, ...] = ()
+        if self.depth:
+            args += (f'--depth={self.depth}',)
+        if self.filter:
+            args += (f'--filter={self.filter}',)
+        return args
+
+
+FULL_FETCH = FetchOptions()
+
+
+def has_commit(local_path: str, rev: str) -> bool:
+    # --quiet: a missing commit is reported with the exit code only
+    try:
+        shell_cmd(('git', 'rev-parse', '--quiet', '--verify', f'{rev}^{{commit}}'),
+                  cwd=local_path)
+    except subprocess.CalledProcessError:
+        return False
+    return True
+
 
+def git_fetch(local_path: str, remote: str, refspecs: Iterable[str] = (),
+              options: FetchOptions = FULL_FETCH, check: bool = True) -> bool:
+    return shell_run(('git', 'fetch', *options.args(), remote, *refspecs),
+                     check=check, cwd=local_path).returncode == 0
 
-def set_tag(local_path: str, tag: str) -> None:
+
+def is_shallow_repository(local_path: str) -> bool:
+    return shell_cmd(('git', 'rev-parse', '--is-shallow-repository'),
+                     cwd=local_path).strip() == 'true'
+
+
+def deepen_until(local_path: str, rev: str, remote: str, options: FetchOptions) -> None:
+    """Deepen a shallow repository until rev is found (the depth doubles each time)"""
+    depth = options.depth or 1
+    filter_args = options._replace(depth=None).args()
+    while not has_commit(local_path, rev):
+        if not is_shallow_repository(local_path):
+            raise PackagerError(f'{local_path}: {rev} not found on {remote}')
+        shell_run(('git', 'fetch', f'--deepen={depth}', *filter_args, remote),
+                  cwd=local_path)
+        depth *= 2
+
+
+def set_commit(local_path: str, commit_hash: str, remote: str = 'origin',
+               options: FetchOptions = FULL_FETCH) -> None:
+    print(f"== Setting {local_path} repository to commit {commit_hash} ==")
+    if not has_commit(local_path, commit_hash):
+        # fetching a sha may be refused by the server or commit_hash may be abbreviated
+        if not git_fetch(local_path, remote, (commit_hash,), options, check=False):
+            git_fetch(local_path, remote, (), options)
+            # the repository may be shallow from a previous --depth, whatever options
+            if not has_commit(local_path, commit_hash) and is_shallow_repository(local_path):
+                deepen_until(local_path, commit_hash, remote, options)
+    print(shell_cmd(('git', 'reset', '--hard', commit_hash), cwd=local_path))
+
+
+def set_tag(local_path: str, tag: str, remote: str = 'origin',
+            options: FetchOptions = FULL_FETCH) -> None:
     print(f"== Setting {local_path} repository to tag {tag} ==")
-    chdir(local_path)
-    print(shell_cmd(('git', 'fetch', '--all', '--tags')))
-    print(shell_cmd(('git', 'reset', '--hard', f'tags/{tag}')))
+    ref = f'refs/tags/{tag}'
+    if not has_commit(local_path, ref):
+        git_fetch(local_path, remote, (f'{ref}:{ref}',), options)
+    print(shell_cmd(('git', 'reset', '--hard', f'tags/{tag}'), cwd=local_path))
 
 
-def set_branch(local_path: str, branch: str):
+def set_branch(local_path: str, branch: str, remote: str = 'origin',
+               options: FetchOptions = FULL_FETCH):
     print(f"== Setting {local_path} repository to branch {branch} ==")
-    chdir(local_path)
-    print(shell_cmd(('git', 'fetch', '--all')))
-    print(shell_cmd(('git', 'reset', '--hard', f'origin/{branch}')))
+    # the remote branch may have moved: always fetched
+    git_fetch(local_path, remote, (f'+refs/heads/{branch}:refs/remotes/{remote}/{branch}',),
+              options)
+    print(shell_cmd(('git', 'reset', '--hard', f'{remote}/{branch}'), cwd=local_path))
 
 
 LocalPath = str
@@ -93,16 +165,31 @@ def explode_git_url(url: str) -> Optional[Tuple[User, Addr, RemotePath]]:
 def argument_parser(gitconfig: Dict[LocalPath, RemotePath],
                     description: str = 'Synchronize submodules') -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=description)
-    parser.add_argument('submodule', nargs='+', help='last path is used', choices=gitconfig.keys())
+    parser.add_argument('submodule', nargs='+', choices=gitconfig.keys(),
+                        help='last path is used (all paths with -a)')
+    parser.add_argument('-a', '--all-submodules', action='store_true',
+                        help='synchronize all submodules in parallel')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=4,
+                        help='number of submodules synchronized in parallel with -a')
     parser.add_argument('-s', '--sync-hook', nargs='?', metavar='CMD',
                         const='./custom_hooks/sync_repo.sh',
                         default='git fetch -p origin',
                         help='disabled that with an empty command')
     parser.add_argument('-u', '--username')
+    parser.add_argument('--no-ssh-pool', action='store_false', dest='ssh_pool',
+                        help='open a new ssh connection for each sync hook'
+                             ' instead of sharing a master connection per host')
     group = parser.add_mutually_exclusive_group()
     group.add_argument('-b', '--branch')
     group.add_argument('-t', '--tag')
     group.add_argument('-c', '--commit-hash')
+    parser.add_argument('--depth', metavar='N', type=int,
+                        help='shallow fetch, deepened when a commit is not found')
+    parser.add_argument('--filter', metavar='FILTER-SPEC',
+                        help='partial fetch (for example blob:none),'
+                             ' missing objects are downloaded on demand')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write a Chrome trace-event JSON file (chrome://tracing, Perfetto)')
 
     return parser
 
@@ -117,12 +204,56 @@ def run_synchronizer(gitconfig: Dict[LocalPath, RemotePath], submodule_path: str
             raise Exception(f'Unknown config for {submodule_path}')
 
         user, addr, remote_path = infos
-        fetch_clone(submodule_path, remote_path,
-                    f'{args.username or user}@{addr}', args.sync_hook)
+        with span('fetch clone', submodule=submodule_path):
+            fetch_clone(submodule_path, remote_path,
+                        f'{args.username or user}@{addr}', args.sync_hook,
+                        default_ssh_pool() if args.ssh_pool else None)
 
+    options = FetchOptions(args.depth, args.filter)
     if args.branch:
-        set_branch(submodule_path, args.branch)
+        with span('set branch', submodule=submodule_path, branch=args.branch):
+            set_branch(submodule_path, args.branch, options=options)
     elif args.tag:
-        set_tag(submodule_path, args.tag)
+        with span('set tag', submodule=submodule_path, tag=args.tag):
+            set_tag(submodule_path, args.tag, options=options)
     elif args.commit_hash:
-        set_commit(submodule_path, args.commit_hash)
+        with span('set commit', submodule=submodule_path, commit=args.commit_hash):
+            set_commit(submodule_path, args.commit_hash, options=options)
+
+
+class SyncResult(NamedTuple):
+    submodule: str
+    # None when the synchronization succeeded
+    error: Optional[str]
+    seconds: float
+
+
+def sync_submodules(gitconfig: Dict[LocalPath, RemotePath], submodule_paths: Iterable[str],
+                    args: argparse.Namespace, jobs: int = 1) -> List[SyncResult]:
+    """
+    Run run_synchronizer() for each submodule with at most jobs submodules
+    at the same time. Commands use the submodule path as working directory,
+    so the current directory of the process is never changed.
+    """
+    def sync(submodule_path: str) -> SyncResult:
+        start = time.perf_counter()
+        try:
+            run_synchronizer(gitconfig, submodule_path, args)
+            error = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        return SyncResult(submodule_path, error, time.perf_counter() - start)
+
+    submodule_paths = list(submodule_paths)
+    if jobs > 1 and len(submodule_paths) > 1:
+        with ThreadPoolExecutor(min(jobs, len(submodule_paths))) as executor:
+            return list(executor.map(sync, submodule_paths))
+    return [sync(submodule_path) for submodule_path in submodule_paths]
+
+
+def print_sync_report(results: Iterable[SyncResult]) -> None:
+    results = list(results)
+    width = max(len(result.submodule) for result in results)
+    for submodule, error, seconds in results:
+        status = '\x1b[32mok\x1b[0m' if error is None else f'\x1b[31mfailed\x1b[0m: {error}'
+        print(f'{submodule:<{width}}  {seconds * 1000:8.1f} ms  {status}')
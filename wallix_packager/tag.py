@@ -1,9 +1,12 @@
 import re
-from typing import List
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Optional, TYPE_CHECKING
 
 from .shell import (confirm,
                     errexit,
                     shell_cmd,
+                    shell_lines,
                     git_last_tag,
                     git_current_branch,
                     git_uncommited_changes,
@@ -13,10 +16,17 @@ from .version import (get_version_extractor,
                       TypingVersion,
                       )
 from .io import (readall, writeall)
+from .error import PackagerError
+from .tracing import span
+from .issue_index import IssueIndex, rgx_issue
 
+if TYPE_CHECKING:
+    from .git_session import GitSession
 
-def current_tag(repo_name: str, branch: str, ignore_change_and_not_pull: bool) -> str:
-    current_branch = git_current_branch()
+
+def current_tag(repo_name: str, branch: str, ignore_change_and_not_pull: bool,
+                session: Optional['GitSession'] = None) -> str:
+    current_branch = git_current_branch(session)
 
     if current_branch != branch:
         if not confirm(f'{repo_name}: {current_branch} '
@@ -32,6 +42,9 @@ def current_tag(repo_name: str, branch: str, ignore_change_and_not_pull: bool) -
 
         shell_cmd(['git', 'pull', 'origin', current_branch, '--rebase'])
 
+    if session is not None:
+        session.refresh_refs()
+
     return git_last_tag()
 
 
@@ -62,9 +75,15 @@ def compute_suffix(repo_name: str, unofficial: str, current_suffix: str) -> str:
     return f'{current_suffix[:-2]}{lastc}'
 
 
-def issues_from(tag: str) -> List[str]:
-    msg = shell_cmd(['git', 'log', '--pretty=tformat:%s', f'{tag}..'])
-    return sorted(set(re.findall(r'((?:\bWAB-|#)\d+)', msg)))
+def issues_from(tag: str, index: Optional[IssueIndex] = None) -> List[str]:
+    """With index, only commits not yet indexed are scanned"""
+    if index is not None:
+        return index.issues_between(tag)
+
+    issues = set()
+    for subject in shell_lines(['git', 'log', '--pretty=tformat:%s', f'{tag}..']):
+        issues.update(rgx_issue.findall(subject))
+    return sorted(issues)
 
 
 def update_version(pattern: re.Pattern, filename: str, new_version: str) -> None:
@@ -74,10 +93,51 @@ def update_version(pattern: re.Pattern, filename: str, new_version: str) -> None
     git_push_version(new_version)
 
 
-def git_push_version(version: str) -> None:
-    shell_cmd(['git', 'commit', '-am', f'Version {version}'])
-    shell_cmd(['git', 'tag', version])
-    shell_cmd(['git', 'push'])
-    shell_cmd(['git', 'push', '--follow-tags'])
-    # the previous command may not push any tags...
-    shell_cmd(['git', 'push', 'origin', f'refs/tags/{version}'])
+class PushStepTiming(NamedTuple):
+    step: str
+    elapsed: float
+
+
+def git_push_version(version: str, remote: str = 'origin',
+                     branch: Optional[str] = None,
+                     cwd: Optional[str] = None) -> List[PushStepTiming]:
+    """
+    Commit, tag then push the branch and the tag with a single
+    `git push --atomic` (both refs are updated or none).
+    The remote refs are checked with one `git ls-remote`.
+    Return the duration of each step.
+    """
+    timings = []
+
+    @contextmanager
+    def step(name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        with span(name, cat='push_version'):
+            yield
+        timings.append(PushStepTiming(name, time.perf_counter() - start))
+
+    with step('commit'):
+        if branch is None:
+            branch = git_current_branch(cwd=cwd)
+        shell_cmd(['git', 'commit', '-am', f'Version {version}'], cwd=cwd)
+        shell_cmd(['git', 'tag', version], cwd=cwd)
+        sha = shell_cmd(['git', 'rev-parse', 'HEAD'], cwd=cwd).strip()
+
+    branch_ref = f'refs/heads/{branch}'
+    tag_ref = f'refs/tags/{version}'
+
+    with step('push'):
+        shell_cmd(['git', 'push', '--atomic', remote,
+                   f'HEAD:{branch_ref}', f'{tag_ref}:{tag_ref}'], cwd=cwd)
+
+    with step('verify'):
+        remote_refs = {}
+        for line in shell_lines(['git', 'ls-remote', remote, branch_ref, tag_ref], cwd=cwd):
+            remote_sha, _, ref = line.partition('\t')
+            remote_refs[ref] = remote_sha
+        for ref in (branch_ref, tag_ref):
+            if remote_refs.get(ref) != sha:
+                raise PackagerError(f'{remote}: {ref} is {remote_refs.get(ref, "missing")},'
+                                    f' expected {sha}')
+
+    return timings
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Sorted index of local and remote git tags
+##
+
+import json
+import time
+import bisect
+from typing import List, Tuple, Iterable, Optional, NamedTuple, Set, TYPE_CHECKING
+from .io import writeall_atomic
+from .shell import shell_lines
+from .version import parse_version, TypingVersion
+
+if TYPE_CHECKING:
+    from .git_session import GitSession
+
+DEFAULT_REMOTE_TAGS_TTL = 300.0
+
+
+def parse_ls_remote_tags(lines: Iterable[str]) -> List[str]:
+    """
+    Tags of `git ls-remote --tags` output:
+    7b997fa58cd40848273c4b1469c787b0cdd69e84        refs/tags/9.1.33
+    dd3d667d68906c77e6fc47b5b8d19ff12fc47104        refs/tags/9.1.33^{}
+    """
+    tags = {}
+    prefix = 'refs/tags/'
+    for line in lines:
+        ref = line.rstrip('\n').partition('\t')[2]
+        if ref.startswith(prefix):
+            tag = ref[len(prefix):]
+            if tag.endswith('^{}'):
+                tag = tag[:-3]
+            tags[tag] = None
+    return list(tags)
+
+
+class _SortedTags(NamedTuple):
+    names: Set[str]
+    # sorted by version
+    keys: List[TypingVersion]
+    tags: List[str]
+
+
+def _sort_tags(tags: Iterable[str]) -> _SortedTags:
+    names = set(tags)
+    versions = []
+    for tag in names:
+        try:
+            versions.append((parse_version(tag).key, tag))
+        except ValueError:
+            pass
+    versions.sort()
+    return _SortedTags(names, [v[0] for v in versions], [v[1] for v in versions])
+
+
+def _series_prefix(series: str) -> Tuple[int, ...]:
+    try:
+        return tuple(int(n) for n in series.split('.'))
+    except ValueError:
+        raise ValueError(f'Invalid version series: {series}') from None
+
+
+class TagIndex:
+    """
+    Local and remote tags loaded once and ordered by version.
+
+    Local tags come from `git tag --list` (or session), remote tags from
+    `git ls-remote --tags REMOTE` and are only loaded when a query needs them.
+    With cache_file, remote tags are reused during ttl seconds.
+    """
+
+    def __init__(self,
+                 remote: str = 'origin',
+                 cache_file: Optional[str] = None,
+                 ttl: float = DEFAULT_REMOTE_TAGS_TTL,
+                 local_tags: Optional[Iterable[str]] = None,
+                 remote_tags: Optional[Iterable[str]] = None,
+                 session: Optional['GitSession'] = None):
+        self.remote = remote
+        self.session = session
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._local = None if local_tags is None else _sort_tags(local_tags)
+        self._remote = None if remote_tags is None else _sort_tags(remote_tags)
+        self._all: Optional[_SortedTags] = None
+
+    def _local_tags(self) -> _SortedTags:
+        if self._local is None:
+            if self.session is not None:
+                self._local = _sort_tags(self.session.tags())
+            else:
+                self._local = _sort_tags(filter(None, shell_lines(['git', 'tag', '--list'])))
+        return self._local
+
+    def _read_remote_cache(self) -> Optional[List[str]]:
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                data = json.load(f)
+            if (data['remote'] == self.remote
+                    and 0 <= time.time() - data['time'] < self.ttl):
+                return list(data['tags'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _remote_tags(self) -> _SortedTags:
+        if self._remote is None:
+            tags = self._read_remote_cache() if self.cache_file else None
+            if tags is None:
+                tags = parse_ls_remote_tags(shell_lines(['git', 'ls-remote', '--tags', self.remote]))
+                if self.cache_file:
+                    writeall_atomic(self.cache_file, json.dumps({
+                        'remote': self.remote,
+                        'time': time.time(),
+                        'tags': tags,
+                    }))
+            self._remote = _sort_tags(tags)
+        return self._remote
+
+    def _all_tags(self) -> _SortedTags:
+        if self._all is None:
+            self._all = _sort_tags(self._local_tags().names | self._remote_tags().names)
+        return self._all
+
+    def exists(self, tag: str) -> Tuple[bool, str]:
+        """(True, 'local'), (True, 'remote') or (False, '')"""
+        if tag in self._local_tags().names:
+            return (True, 'local')
+        if tag in self._remote_tags().names:
+            return (True, 'remote')
+        return (False, '')
+
+    def tags(self) -> List[str]:
+        """Local and remote tags ordered by version (tags without version are ignored)"""
+        return list(self._all_tags().tags)
+
+    def predecessor(self, version: str) -> Optional[str]:
+        """Greatest tag lower than version"""
+        sorted_tags = self._all_tags()
+        i = bisect.bisect_left(sorted_tags.keys, parse_version(version).key)
+        return sorted_tags.tags[i - 1] if i else None
+
+    def successor(self, version: str) -> Optional[str]:
+        """Smallest tag greater than version"""
+        sorted_tags = self._all_tags()
+        i = bisect.bisect_right(sorted_tags.keys, parse_version(version).key)
+        return sorted_tags.tags[i] if i < len(sorted_tags.tags) else None
+
+    def latest_in_series(self, series: str) -> Optional[str]:
+        """Greatest tag that starts with series ('9', '9.1', '9.1.2', ...)"""
+        prefix = _series_prefix(series)
+        upper = prefix[:-1] + (prefix[-1] + 1,)
+        sorted_tags = self._all_tags()
+        i = bisect.bisect_left(sorted_tags.keys, upper)
+        if i and sorted_tags.keys[i - 1][:len(prefix)] == prefix:
+            return sorted_tags.tags[i - 1]
+        return None
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Compiled %VAR% templates and template cache
+##
+
+import os
+import re
+import json
+import hashlib
+from typing import Dict, Tuple, Mapping, NamedTuple, Optional
+from .io import writeall_atomic
+
+var_ident = '[A-Z][A-Z0-9_]*'
+
+rgx_template_var = re.compile(f'%({var_ident})%')
+rgx_template_var_bytes = re.compile(f'%{var_ident}%'.encode())
+
+TEMPLATE_CACHE_FORMAT = 2
+
+
+class Template(NamedTuple):
+    """
+    literals[i] is followed by the value of variables[i].
+    len(literals) == len(variables) + 1
+    """
+    literals: Tuple[str, ...]
+    variables: Tuple[str, ...]
+
+    def render(self, variables: Mapping[str, str]) -> str:
+        if not self.variables:
+            return self.literals[0]
+        parts = [''] * (len(self.literals) + len(self.variables))
+        parts[::2] = self.literals
+        parts[1::2] = [variables.get(var, '') for var in self.variables]
+        return ''.join(parts)
+
+
+def compile_template(text: str) -> Template:
+    literals = []
+    variables = []
+    pos = 0
+    for m in rgx_template_var.finditer(text):
+        literals.append(text[pos:m.start()])
+        variables.append(m.group(1))
+        pos = m.end()
+    literals.append(text[pos:])
+    return Template(tuple(literals), tuple(variables))
+
+
+class _CachedTemplate(NamedTuple):
+    digest: str
+    size: int
+    mtime_ns: int
+    # None when the file has no placeholder
+    template: Optional[Template]
+
+
+class TemplateCache:
+    """
+    Compiled templates indexed by path.
+
+    An entry is reused without reading the file when size and mtime are
+    unchanged, otherwise the content hash decides if it must be recompiled.
+    Files without placeholder are not decoded (see load()).
+    With cache_file, entries are loaded from and saved to disk.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None, encoding: str = 'utf-8'):
+        self.cache_file = cache_file
+        self.encoding = encoding
+        self._entries: Dict[str, _CachedTemplate] = {}
+        self._modified = False
+        if cache_file:
+            self._load_cache_file(cache_file)
+
+    def _load_cache_file(self, cache_file: str) -> None:
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) or data.get('format') != TEMPLATE_CACHE_FORMAT:
+            return
+
+        for path, entry in data.get('templates', {}).items():
+            try:
+                self._entries[path] = _CachedTemplate(
+                    digest=entry['digest'],
+                    size=entry['size'],
+                    mtime_ns=entry['mtime_ns'],
+                    template=None if entry['passthrough'] else
+                             Template(tuple(entry['literals']),
+                                      tuple(entry['variables'])),
+                )
+            except (KeyError, TypeError):
+                pass
+
+    def get(self, path: str) -> Template:
+        template = self.load(path)[1]
+        if template is None:
+            with open(path, encoding=self.encoding) as f:
+                return Template((f.read(),), ())
+        return template
+
+    def load(self, path: str) -> Tuple[str, Optional[Template]]:
+        """
+        Return content hash and compiled template.
+        The template is None when the file has no placeholder and
+        can be copied as is.
+        """
+        st = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+            return entry.digest, entry.template
+
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha1(content).hexdigest()
+
+        if entry is not None and entry.digest == digest:
+            template = entry.template
+        elif rgx_template_var_bytes.search(content) is None:
+            template = None
+        else:
+            template = compile_template(content.decode(self.encoding))
+
+        self._entries[path] = _CachedTemplate(digest, st.st_size, st.st_mtime_ns, template)
+        self._modified = True
+        return digest, template
+
+    def save(self) -> None:
+        if not self.cache_file or not self._modified:
+            return
+
+        data = {
+            'format': TEMPLATE_CACHE_FORMAT,
+            'templates': {
+                path: {
+                    'digest': entry.digest,
+                    'size': entry.size,
+                    'mtime_ns': entry.mtime_ns,
+                    'passthrough': True,
+                } if entry.template is None else {
+                    'digest': entry.digest,
+                    'size': entry.size,
+                    'mtime_ns': entry.mtime_ns,
+                    'passthrough': False,
+                    'literals': entry.template.literals,
+                    'variables': entry.template.variables,
+                }
+                for path, entry in self._entries.items()
+            },
+        }
+        writeall_atomic(self.cache_file, json.dumps(data))
+        self._modified = False
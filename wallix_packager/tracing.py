@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Spans recorded in Chrome trace-event format
+##
+
+import os
+import json
+import time
+import threading
+import functools
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class Tracer:
+    """Complete events ("ph": "X") of the Chrome trace-event format"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def add(self, name: str, start_ns: int, end_ns: int,
+            args: Dict[str, Any], tid: Optional[int] = None) -> None:
+        event = {
+            'name': name,
+            'cat': args.pop('cat', 'packager'),
+            'ph': 'X',
+            'ts': start_ns / 1000,
+            'dur': (end_ns - start_ns) / 1000,
+            'pid': self._pid,
+            'tid': threading.get_ident() if tid is None else tid,
+            'args': args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def extend(self, events: List[Dict[str, Any]]) -> None:
+        """Add events recorded by an other process"""
+        with self._lock:
+            self.events.extend(events)
+
+    def save(self, filename: str) -> None:
+        with self._lock:
+            data = {'traceEvents': self.events, 'displayTimeUnit': 'ms'}
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing(filename: Optional[str] = None) -> Optional[Tracer]:
+    """Disable tracing and write events into filename"""
+    global _tracer
+    tracer = _tracer
+    _tracer = None
+    if tracer is not None and filename:
+        tracer.save(filename)
+    return tracer
+
+
+def is_tracing() -> bool:
+    return _tracer is not None
+
+
+def add_trace_events(events: List[Dict[str, Any]]) -> None:
+    if _tracer is not None:
+        _tracer.extend(events)
+
+
+class _Span:
+    __slots__ = ('_tracer', '_name', '_args', '_start', '_tid')
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict[str, Any], tid: Optional[int]):
+        self._tracer = tracer
+        self._name = name
+        self._args = args
+        self._tid = tid
+        self._start = 0
+
+    def set(self, **args: Any) -> None:
+        self._args.update(args)
+
+    def __enter__(self) -> '_Span':
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._args['error'] = f'{exc_type.__name__}: {exc}'
+        self._tracer.add(self._name, self._start, time.perf_counter_ns(), self._args, self._tid)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_null_span = _NullSpan()
+
+
+def span(name: str, tid: Optional[int] = None, **args: Any):
+    """
+    Context manager that records a span when tracing is enabled.
+    Arguments can be added with `.set(key=value)` on the returned object.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _null_span
+    return _Span(tracer, name, args, tid)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator version of span()"""
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore
+    return decorator
@@ -8,14 +8,27 @@
 ##
 
 import re
-from typing import Tuple
+import heapq
+import functools
+from typing import Tuple, List, Iterable, Union
+from .error import PackagerError
 
 TypingVersion = Tuple[int, int, int, int, int, str]
 
+_rgx_version = re.compile(
+    r'[^\d]*(\d+)(?:\.(\d+))?(?:[-.](\d+))?(?:[-.](\d+))?(?:[-.](\d+))?(.*)')
+
+
+@functools.lru_cache(maxsize=128)
+def regex_version_or_die(pattern: Union[str, bytes]) -> re.Pattern:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise PackagerError(f'Invalid error on regex version: {pattern}') from e
+
 
 def get_version_extractor() -> re.Pattern:
-    return re.compile(
-        r'[^\d]*(\d+)(?:\.(\d+))?(?:[-.](\d+))?(?:[-.](\d+))?(?:[-.](\d+))?(.*)')
+    return _rgx_version
 
 
 def re_match_version_to_tuple(m: re.Match) -> TypingVersion:
@@ -29,8 +42,62 @@ def re_match_version_to_tuple(m: re.Match) -> TypingVersion:
     )
 
 
+@functools.total_ordering
+class Version:
+    """
+    Parsed version. Comparisons use key, so '1.2' == '1.2.0'.
+    """
+    __slots__ = ('text', 'key')
+
+    def __init__(self, text: str, key: TypingVersion):
+        self.text = text
+        self.key = key
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.key == other.key
+
+    def __lt__(self, other: 'Version') -> bool:
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.key < other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f'Version({self.text!r})'
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def parse_version(text: str) -> Version:
+    """Raise ValueError when text does not contain a version"""
+    m = _rgx_version.match(text)
+    if m is None:
+        raise ValueError(f'Invalid version: {text}')
+    return Version(text, re_match_version_to_tuple(m))
+
+
+def version_key(text: str) -> TypingVersion:
+    return parse_version(text).key
+
+
+def sort_versions(versions: Iterable[str], reverse: bool = False) -> List[str]:
+    return sorted(versions, key=version_key, reverse=reverse)
+
+
+def max_version(versions: Iterable[str]) -> str:
+    return max(versions, key=version_key)
+
+
+def latest_n(versions: Iterable[str], n: int) -> List[str]:
+    """n greatest versions, greatest first"""
+    return heapq.nlargest(n, versions, key=version_key)
+
+
 def less_version(lhs_version: str, rhs_version: str) -> bool:
-    patt = get_version_extractor()
-    m1 = patt.match(lhs_version)
-    m2 = patt.match(rhs_version)
-    return re_match_version_to_tuple(m1) < re_match_version_to_tuple(m2)
+    return parse_version(lhs_version) < parse_version(rhs_version)
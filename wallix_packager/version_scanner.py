@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+##
+# Copyright (c) 2010-2022 WALLIX, SARL. All rights reserved.
+# Licensed computer software. Property of WALLIX.
+# Product name: Packager
+# Module description: Extract versions of many files in a single pass
+##
+
+import os
+import mmap
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Callable, Iterable, Iterator, NamedTuple
+from .version import regex_version_or_die
+
+# files greater than this size are mapped instead of read
+MMAP_THRESHOLD = 1 << 20
+
+SKIPPED_DIRECTORIES = frozenset(('.git', '.hg', '.svn', '__pycache__'))
+
+
+class VersionRule(NamedTuple):
+    # fnmatch pattern on the path relative to the root directory ('*' matches '/')
+    glob: str
+    # regex where the first group is the version
+    pattern: str
+
+
+class ScannedVersion(NamedTuple):
+    filename: str
+    rule: VersionRule
+    # normalized version
+    version: str
+    # byte offsets of the version in the file
+    position: Tuple[int, int]
+    # text matched by the rule
+    matched_text: str
+
+
+def iter_files(root: str) -> Iterator[str]:
+    """Relative path of each regular file, with os.scandir()"""
+    directories = ['']
+    while directories:
+        reldir = directories.pop()
+        with os.scandir(os.path.join(root, reldir) if reldir else root) as it:
+            entries = list(it)
+        for entry in entries:
+            relpath = f'{reldir}/{entry.name}' if reldir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIPPED_DIRECTORIES:
+                    directories.append(relpath)
+            elif entry.is_file():
+                yield relpath
+
+
+def _search_rules(buffer, filename: str, rules: Iterable[VersionRule],
+                  normalizer: Callable[[str], str]) -> List[ScannedVersion]:
+    results = []
+    for rule in rules:
+        # search() stops on the first match
+        m = regex_version_or_die(rule.pattern.encode()).search(buffer)
+        if m is not None:
+            results.append(ScannedVersion(
+                filename=filename,
+                rule=rule,
+                version=normalizer(m.group(1).decode(errors='replace')),
+                position=m.span(1),
+                matched_text=m.group(0).decode(errors='replace'),
+            ))
+    return results
+
+
+def scan_file(root: str, filename: str, rules: Iterable[VersionRule],
+              normalizer: Callable[[str], str] = lambda s: s) -> List[ScannedVersion]:
+    """Apply all rules to a file read only once"""
+    with open(os.path.join(root, filename), 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return _search_rules(b'', filename, rules, normalizer)
+        if size < MMAP_THRESHOLD:
+            return _search_rules(f.read(), filename, rules, normalizer)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _search_rules(buffer, filename, rules, normalizer)
+
+
+def match_files(root: str, rules: Iterable[VersionRule]) -> List[Tuple[str, List[VersionRule]]]:
+    """Sorted relative paths with the rules whose glob matches"""
+    rules = list(rules)
+    files: List[Tuple[str, List[VersionRule]]] = []
+    for filename in iter_files(root):
+        matched_rules = [rule for rule in rules if fnmatch.fnmatchcase(filename, rule.glob)]
+        if matched_rules:
+            files.append((filename, matched_rules))
+    files.sort()
+    return files
+
+
+def scan_versions(root: str,
+                  rules: Iterable[VersionRule],
+                  normalizer: Callable[[str], str] = lambda s: s,
+                  jobs: int = 1) -> List[ScannedVersion]:
+    rules = list(rules)
+    for rule in rules:
+        regex_version_or_die(rule.pattern.encode())
+
+    files = match_files(root, rules)
+
+    def scan(item: Tuple[str, List[VersionRule]]) -> List[ScannedVersion]:
+        return scan_file(root, item[0], item[1], normalizer)
+
+    if jobs > 1:
+        with ThreadPoolExecutor(jobs) as executor:
+            results = list(executor.map(scan, files))
+    else:
+        results = list(map(scan, files))
+
+    return [scanned for file_results in results for scanned in file_results]
+
+
+def group_by_version(results: Iterable[ScannedVersion]) -> Dict[str, List[ScannedVersion]]:
+    """More than one key means a version mismatch"""
+    groups: Dict[str, List[ScannedVersion]] = {}
+    for scanned in results:
+        groups.setdefault(scanned.version, []).append(scanned)
+    return groups